@@ -0,0 +1,112 @@
+import asyncio
+import functools
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from scheduler import POLL_QUEUE_DUE, POLL_QUEUE_SIZE
+
+
+class AsyncEngine:
+    """Асинхронный опрос подписок с ограничением параллельности.
+
+    Блокирующие вызовы API и Telegram выполняются в пуле потоков,
+    одновременно работает не больше `concurrency` опросов.
+    """
+
+    def __init__(self, poll, concurrency=100):
+        self.poll = poll
+        self.concurrency = concurrency
+        self._executor = ThreadPoolExecutor(
+            max_workers=concurrency, thread_name_prefix='poll')
+        self._semaphore = None
+        self._wake = None
+        self._inflight = set()
+        self._tasks = set()
+
+    async def poll_one(self, bot, subscription, stop=None):
+        """Опросить одну подписку под семафором.
+
+        Если `stop` выставлен, пока опрос ждал семафора, он пропускается.
+        """
+        async with self._semaphore:
+            if stop is not None and stop.is_set():
+                return False
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._executor, self.poll, bot, subscription)
+
+    def _finished(self, subscription, queue, policy, task):
+        """Переназначить срок подписки после её опроса."""
+        self._inflight.discard(subscription.key)
+        self._tasks.discard(task)
+        changed = False
+        if not task.cancelled():
+            error = task.exception()
+            if error is not None:
+                logging.error('Сбой опроса подписки: %s', error)
+            changed = task.result() if error is None else False
+        queue.push(subscription.key,
+                   policy.reschedule(subscription, changed is True))
+        self._wake.set()
+
+    def _start_due(self, bot, registry, queue, policy, stop=None):
+        """Запустить задачи для подписок, срок опроса которых наступил."""
+        for key in registry.take_added():
+            if key not in self._inflight:
+                queue.push(key, 0)
+        due = queue.pop_due(time.time())
+        POLL_QUEUE_DUE.set(len(due))
+        POLL_QUEUE_SIZE.set(len(queue))
+        for key in due:
+            subscription = registry.get(key)
+            if subscription is None or key in self._inflight:
+                continue
+            self._inflight.add(key)
+            task = asyncio.create_task(
+                self.poll_one(bot, subscription, stop))
+            self._tasks.add(task)
+            task.add_done_callback(functools.partial(
+                self._finished, subscription, queue, policy))
+
+    async def run_forever(self, bot, registry, queue, policy, stop=None):
+        """Опрашивать подписки по очереди сроков и политике.
+
+        Каждая подписка опрашивается своей задачей и получает новый срок
+        сразу по завершении, поэтому медленный ответ не задерживает
+        остальные подписки. Цикл просыпается к ближайшему сроку или по
+        завершении опроса. При `stop` новые опросы не начинаются, а ждущие
+        семафора пропускаются; цикл дожидается только уже идущих.
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._wake = asyncio.Event()
+        try:
+            while stop is None or not stop.is_set():
+                self._start_due(bot, registry, queue, policy, stop)
+                next_due = queue.next_due()
+                if next_due is None:
+                    next_due = time.time() + policy.default_interval
+                await self.wait(min(
+                    policy.min_interval, max(0, next_due - time.time())),
+                    stop)
+        finally:
+            if self._tasks:
+                await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def wait(self, delay, stop=None, step=0.5):
+        """Ждать до `delay` секунд, проснувшись при завершении опроса.
+
+        С `stop` ожидание прерывается не позже чем через `step` секунд.
+        """
+        try:
+            await asyncio.wait_for(
+                self._wake.wait(),
+                delay if stop is None else min(delay, step))
+        except asyncio.TimeoutError:
+            pass
+        self._wake.clear()
+
+    def close(self):
+        """Остановить пул потоков."""
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,69 @@
+"""Разбор ответа API: json + check_response против decode_response.
+
+Запуск: python benchmarks/bench_decoding.py [работ в ответе ...]
+"""
+import json
+import sys
+import timeit
+from os.path import abspath, dirname
+
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+
+import decoding  # noqa: E402
+import homework  # noqa: E402
+
+STATUSES = list(homework.HOMEWORK_STATUSES)
+
+
+def make_payload(count):
+    return json.dumps({
+        'homeworks': [
+            {
+                'id': number,
+                'status': STATUSES[number % len(STATUSES)],
+                'homework_name': f'student__hw{number:03}.zip',
+                'reviewer_comment': 'Всё нравится, но есть пара замечаний',
+                'date_updated': '2020-02-13T14:40:57Z',
+                'lesson_name': f'Урок {number}',
+            }
+            for number in range(count)
+        ],
+        'current_date': 1581604970,
+    }).encode('UTF-8')
+
+
+def legacy(content):
+    homeworks = homework.check_response(json.loads(content))
+    for item in homeworks:
+        if 'homework_name' not in item:
+            raise KeyError
+        if item.get('status') not in homework.HOMEWORK_STATUSES:
+            raise ValueError
+    return homeworks
+
+
+def measure(name, func, content, number):
+    seconds = min(timeit.repeat(
+        lambda: func(content), number=number, repeat=5)) / number
+    print(f'  {name:<28} {seconds * 1e6:9.1f} us')
+
+
+def main(sizes):
+    print(f'Декодер decode_response: {decoding.loads.__module__}')
+    for size in sizes:
+        content = make_payload(size)
+        number = max(10, 20000 // size)
+        print(f'Работ: {size}, размер ответа: {len(content)} байт')
+        measure('json + check_response', legacy, content, number)
+        measure('decode_response', lambda body: decoding.decode_response(
+            body, homework.HOMEWORK_STATUSES), content, number)
+        fast = decoding.loads, decoding.COMPACT_RECORDS
+        decoding.loads, decoding.COMPACT_RECORDS = json.loads, False
+        measure('decode_response (stdlib)', lambda body: (
+            decoding.decode_response(body, homework.HOMEWORK_STATUSES)),
+            content, number)
+        decoding.loads, decoding.COMPACT_RECORDS = fast
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [100, 500, 1000])
@@ -0,0 +1,90 @@
+"""Пропускная способность DeliveryQueue с поддельным ботом.
+
+Лимит на чат по умолчанию как у Telegram - одно сообщение в секунду,
+поэтому видно, задерживает ли чат с исчерпанным лимитом остальные.
+Первая волна сообщений идёт в половину чатов, вторая - во все чаты,
+пока у чатов первой волны лимит ещё не восстановился. Для второй
+волны печатается задержка первой отправки в новые и в ограниченные чаты.
+
+Запуск: python benchmarks/bench_delivery.py [сообщений] [чатов] [задержка]
+        [сообщений в секунду на чат]
+"""
+import functools
+import statistics
+import sys
+import threading
+import time
+from os.path import abspath, dirname
+
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+
+from delivery import DeliveryQueue  # noqa: E402
+
+
+class FakeBot:
+    """Бот, который только ждёт `latency` секунд на каждое сообщение."""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.calls = 0
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        time.sleep(self.latency)
+        self.calls += 1
+
+
+def send_wave(queue, numbers, chats, delays):
+    """Поставить сообщения в очередь, записывая задержку отправки."""
+    lock = threading.Lock()
+
+    def done(chat_id, enqueued, sent):
+        with lock:
+            delays.setdefault(chat_id, time.perf_counter() - enqueued)
+
+    for number in numbers:
+        chat_id = number % chats
+        queue.send_message(
+            chat_id=chat_id, text=f'status {number}',
+            on_done=functools.partial(done, chat_id, time.perf_counter()))
+
+
+def wait_sent(queue, timeout=60):
+    deadline = time.monotonic() + timeout
+    while queue.pending() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def describe(delays):
+    delays = sorted(delays)
+    return (f'медиана {statistics.median(delays):.3f} с, '
+            f'p95 {delays[int(len(delays) * 0.95)]:.3f} с')
+
+
+def main(messages, chats, latency, chat_rate):
+    bot = FakeBot(latency)
+    queue = DeliveryQueue(bot, chat_rate=chat_rate, global_rate=10_000)
+    queue.start()
+    started = time.perf_counter()
+    send_wave(queue, range(messages // 2), chats // 2, {})
+    wait_sent(queue)
+    delays = {}
+    send_wave(queue, range(messages // 2, messages), chats, delays)
+    queue.close()
+    elapsed = time.perf_counter() - started
+    print(f'Сообщений: {messages}, чатов: {chats}, задержка: {latency} с, '
+          f'лимит чата: {chat_rate}/с')
+    print(f'Отправлено текстов: {queue.sent}, вызовов API: {bot.calls}')
+    print(f'Время: {elapsed:.2f} с, {queue.sent / elapsed:.0f} сообщений/с, '
+          f'{bot.calls / elapsed:.0f} вызовов/с')
+    print('Вторая волна, новые чаты: ' + describe(
+        delay for chat_id, delay in delays.items() if chat_id >= chats // 2))
+    print('Вторая волна, чаты с исчерпанным лимитом: ' + describe(
+        delay for chat_id, delay in delays.items() if chat_id < chats // 2))
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    main(int(args[0]) if args else 50_000,
+         int(args[1]) if len(args) > 1 else 1000,
+         float(args[2]) if len(args) > 2 else 0.001,
+         float(args[3]) if len(args) > 3 else 1)
@@ -0,0 +1,64 @@
+"""Запросы к истории статусов на большом журнале событий.
+
+Пишет журнал из заданного числа событий за месяц, открывает его
+заново и замеряет выборку событий и агрегатов одного токена.
+
+Запуск: python benchmarks/bench_history.py [событий] [токенов]
+"""
+import random
+import sys
+import tempfile
+import time
+from os.path import abspath, dirname
+
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+
+from history import StatusHistory  # noqa: E402
+
+STATUSES = ('reviewing', 'rejected', 'approved')
+MONTH = 30 * 24 * 3600
+
+
+def fill(directory, events, tokens, rng):
+    history = StatusHistory(directory, snapshot_interval=3600)
+    start = int(time.time()) - MONTH
+    for number in range(events):
+        history.record(
+            f'token{rng.randrange(tokens)}', rng.randrange(20), None,
+            None, rng.choice(STATUSES), start + number * MONTH // events)
+        if number % 100000 == 0:
+            history.flush()
+    history.close()
+
+
+def measure(function, repeats=100):
+    started = time.perf_counter()
+    for _ in range(repeats):
+        result = function()
+    return (time.perf_counter() - started) / repeats * 1000, result
+
+
+def main():
+    events = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    tokens = int(sys.argv[2]) if len(sys.argv) > 2 else 10000
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as directory:
+        started = time.perf_counter()
+        fill(directory, events, tokens, rng)
+        print(f'Событий: {events}, токенов: {tokens}, '
+              f'запись {time.perf_counter() - started:.1f} с')
+        started = time.perf_counter()
+        history = StatusHistory(directory)
+        print(f'  открытие журнала   {time.perf_counter() - started:.2f} с')
+        token = f'token{tokens // 2}'
+        elapsed, found = measure(lambda: history.events(token))
+        print(f'  события токена     {elapsed:.2f} мс ({len(found)} шт.)')
+        since = int(time.time()) - 7 * 24 * 3600
+        elapsed, found = measure(lambda: history.events(token, since=since))
+        print(f'  за последнюю неделю {elapsed:.2f} мс ({len(found)} шт.)')
+        elapsed, found = measure(lambda: history.stats(token))
+        print(f'  агрегаты токена    {elapsed:.3f} мс ({len(found)} работ)')
+
+
+if __name__ == '__main__':
+    main()
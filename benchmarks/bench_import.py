@@ -0,0 +1,65 @@
+"""Время импорта homework по -X importtime с бюджетом на холодный старт.
+
+Запускает `python -X importtime -c "import homework"` несколько раз,
+берёт медиану суммарного времени импорта модуля и проверяет, что
+тяжёлые зависимости (telegram, requests, asyncio, dotenv, http.server)
+не загружаются при импорте. Код выхода 1, если бюджет превышен.
+
+Запуск: python benchmarks/bench_import.py --budget-ms 100
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from os.path import abspath, dirname
+
+ROOT = dirname(dirname(abspath(__file__)))
+DEFERRED = ('telegram', 'requests', 'asyncio', 'dotenv', 'http.server')
+
+
+def import_time(module):
+    """Суммарное время импорта модуля в микросекундах."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+        env=dict(os.environ, PYTHONDONTWRITEBYTECODE=''))
+    for line in result.stderr.splitlines():
+        if line.endswith(f'| {module}'):
+            return int(line.split('|')[1])
+    raise RuntimeError(f'Нет строки importtime для {module}')
+
+
+def loaded_modules(module, names):
+    """Какие из модулей `names` загружены после импорта `module`."""
+    code = (f'import json, sys, {module}; '
+            f'print(json.dumps([name for name in {list(names)!r} '
+            f'if name in sys.modules]))')
+    result = subprocess.run(
+        [sys.executable, '-c', code], cwd=ROOT,
+        capture_output=True, text=True, check=True)
+    return json.loads(result.stdout)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--budget-ms', type=float, default=100)
+    parser.add_argument('--repeats', type=int, default=7)
+    args = parser.parse_args(argv)
+    import_time('homework')
+    timings = [import_time('homework') / 1000 for _ in range(args.repeats)]
+    median = statistics.median(timings)
+    loaded = loaded_modules('homework', DEFERRED)
+    print(f'import homework: медиана {median:.1f} мс, '
+          f'мин {min(timings):.1f} мс, бюджет {args.budget_ms:.0f} мс')
+    if loaded:
+        print(f'Загружены при импорте: {", ".join(loaded)}')
+    if median > args.budget_ms or loaded:
+        print('Бюджет старта превышен')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
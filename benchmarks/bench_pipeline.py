@@ -0,0 +1,309 @@
+"""Сквозной бенчмарк бота на локальных заглушках Практикума и Telegram.
+
+Заглушка API Практикума меняет статусы работ с заданной частотой,
+отвечает с задержкой, долей ошибок и размером ответа из параметров.
+Заглушка Telegram принимает sendMessage и засекает время получения.
+Результат - JSON с числом опросов и уведомлений в секунду и
+перцентилями задержки от смены статуса до уведомления.
+
+Запуск: python benchmarks/bench_pipeline.py --subscriptions 1000 --output
+bench_output.json
+"""
+import argparse
+import asyncio
+import functools
+import json
+import logging
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from os.path import abspath, dirname
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+
+import homework  # noqa: E402
+import metrics  # noqa: E402
+import telegram  # noqa: E402
+from telegram.utils.request import Request  # noqa: E402
+from async_engine import AsyncEngine  # noqa: E402
+from breaker import CircuitBreaker  # noqa: E402
+from cache import ResponseCache  # noqa: E402
+from delivery import DeliveryQueue  # noqa: E402
+from scheduler import AdaptivePolicy  # noqa: E402
+from session import PracticumSession  # noqa: E402
+from state import HomeworkStates  # noqa: E402
+from subscriptions import SubscriptionRegistry  # noqa: E402
+
+STATUSES = ('reviewing', 'rejected', 'approved')
+NAME_PATTERN = re.compile(r'"([^"]+)"')
+
+
+class FakePracticum:
+    """Состояние заглушки API: работы по токенам и время их изменений."""
+
+    def __init__(self, tokens, homeworks, padding, latency, error_rate):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.padding = 'x' * padding
+        self.lock = threading.Lock()
+        self.changed_at = {}
+        self.homeworks = {
+            token: [
+                {
+                    'id': number,
+                    'homework_name': f'{token}-hw{number}',
+                    'status': 'reviewing',
+                    'date_updated': 0,
+                }
+                for number in range(homeworks)
+            ]
+            for token in tokens
+        }
+        self.requests = 0
+
+    def change_random(self, rng):
+        """Сменить статус случайной работы и запомнить время."""
+        token = rng.choice(list(self.homeworks))
+        with self.lock:
+            homework_data = rng.choice(self.homeworks[token])
+            homework_data['status'] = rng.choice(
+                [status for status in STATUSES
+                 if status != homework_data['status']])
+            now = time.time()
+            homework_data['date_updated'] = int(now)
+            self.changed_at[homework_data['homework_name']] = now
+
+    def response(self, token, from_date):
+        """Тело ответа homework_statuses для токена."""
+        with self.lock:
+            self.requests += 1
+            homeworks = [
+                dict(item, reviewer_comment=self.padding)
+                for item in self.homeworks.get(token, ())
+                if item['date_updated'] >= from_date
+            ]
+        return {'homeworks': homeworks, 'current_date': int(time.time())}
+
+
+class FakeTelegram:
+    """Состояние заглушки Telegram: время получения уведомлений."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.received = {}
+        self.calls = 0
+
+    def record(self, text):
+        """Запомнить время получения уведомлений из текста."""
+        now = time.time()
+        with self.lock:
+            self.calls += 1
+            for name in NAME_PATTERN.findall(text):
+                self.received.setdefault(name, []).append(now)
+
+
+def practicum_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            if state.latency:
+                time.sleep(state.latency)
+            if random.random() < state.error_rate:
+                self.reply(500, {'error': 'fake'})
+                return
+            token = self.headers['Authorization'].split()[-1]
+            query = parse_qs(urlparse(self.path).query)
+            from_date = int(float(query['from_date'][0]))
+            self.reply(200, state.response(token, from_date))
+
+        def reply(self, code, data):
+            body = json.dumps(data).encode('UTF-8')
+            self.send_response(code)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+    return Handler
+
+
+def telegram_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length', 0))
+            data = json.loads(self.rfile.read(length) or b'{}')
+            state.record(data.get('text', ''))
+            body = json.dumps({'ok': True, 'result': {
+                'message_id': 1,
+                'date': int(time.time()),
+                'chat': {'id': int(data.get('chat_id', 0)),
+                         'type': 'private'},
+                'text': data.get('text', ''),
+            }}).encode('UTF-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+    return Handler
+
+
+def serve(handler):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def run_changes(practicum, rate, stop, seed):
+    rng = random.Random(seed)
+    while not stop.wait(1 / rate):
+        practicum.change_random(rng)
+
+
+def run(args):
+    tokens = [f'token{number}' for number in range(args.subscriptions)]
+    practicum = FakePracticum(
+        tokens, args.homeworks, args.padding, args.latency, args.error_rate)
+    telegram_state = FakeTelegram()
+    practicum_server = serve(practicum_handler(practicum))
+    telegram_server = serve(telegram_handler(telegram_state))
+    homework.ENDPOINT = (
+        f'http://127.0.0.1:{practicum_server.server_address[1]}/')
+
+    registry = SubscriptionRegistry()
+    start_date = int(time.time())
+    for number, token in enumerate(tokens):
+        subscription = registry.add(token, number + 1, start_date)
+        subscription.statuses = HomeworkStates({
+            str(item['id']): item['status']
+            for item in practicum.homeworks[token]
+        })
+    bot = DeliveryQueue(
+        telegram.Bot(
+            '1234:bench',
+            base_url=(f'http://127.0.0.1:'
+                      f'{telegram_server.server_address[1]}/bot'),
+            request=Request(con_pool_size=args.concurrency)),
+        chat_rate=args.chat_rate, global_rate=args.global_rate,
+        workers=args.delivery_workers)
+    session = PracticumSession(args.concurrency)
+    cache = ResponseCache()
+    poll = functools.partial(
+        homework.poll_subscription, session=session,
+        breaker=CircuitBreaker(min_calls=10 ** 9),
+        cache=cache)
+    policy = AdaptivePolicy(
+        min_interval=args.min_interval, max_interval=args.max_interval,
+        default_interval=args.min_interval, jitter=0.1)
+    engine = AsyncEngine(poll, args.concurrency)
+    polls = metrics.REGISTRY.counter(
+        'bot_calls_total', function='get_api_answer')
+    polls_before = polls.value
+
+    stop = threading.Event()
+    changer = threading.Thread(
+        target=run_changes,
+        args=(practicum, args.change_rate, stop, args.seed), daemon=True)
+    bot.start()
+    changer.start()
+    started = time.perf_counter()
+    try:
+        asyncio.run(asyncio.wait_for(
+            engine.run_forever(
+                bot, registry, homework.build_queue(registry), policy),
+            args.duration))
+    except asyncio.TimeoutError:
+        pass
+    elapsed = time.perf_counter() - started
+    stop.set()
+    changer.join()
+    bot.close(timeout=10)
+    engine.close()
+    connections = session.stats()
+    session.close()
+    practicum_server.shutdown()
+    telegram_server.shutdown()
+
+    latencies = []
+    with telegram_state.lock, practicum.lock:
+        for name, changed_at in practicum.changed_at.items():
+            received = [moment for moment in telegram_state.received.get(
+                name, ()) if moment >= changed_at]
+            if received:
+                latencies.append(received[0] - changed_at)
+        changes = len(practicum.changed_at)
+    notifications = sum(map(len, telegram_state.received.values()))
+    return {
+        'parameters': vars(args),
+        'elapsed_seconds': round(elapsed, 3),
+        'polls': polls.value - polls_before,
+        'polls_per_second': round((polls.value - polls_before) / elapsed, 1),
+        'notifications': notifications,
+        'notifications_per_second': round(notifications / elapsed, 1),
+        'telegram_calls': telegram_state.calls,
+        'status_changes': changes,
+        'changes_notified': len(latencies),
+        'latency_p50_seconds': percentile(latencies, 0.5),
+        'latency_p99_seconds': percentile(latencies, 0.99),
+        'cache_hits': cache.hits,
+        'cache_misses': cache.misses,
+        'connections': connections,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--subscriptions', type=int, default=1000)
+    parser.add_argument('--homeworks', type=int, default=3,
+                        help='работ на одну подписку')
+    parser.add_argument('--padding', type=int, default=200,
+                        help='байт комментария ревьюера в каждой работе')
+    parser.add_argument('--latency', type=float, default=0.005,
+                        help='задержка ответа API, с')
+    parser.add_argument('--error-rate', type=float, default=0.01)
+    parser.add_argument('--change-rate', type=float, default=50,
+                        help='смен статусов в секунду')
+    parser.add_argument('--duration', type=float, default=20)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--min-interval', type=float, default=1)
+    parser.add_argument('--max-interval', type=float, default=5)
+    parser.add_argument('--chat-rate', type=float, default=1)
+    parser.add_argument('--global-rate', type=float, default=1000)
+    parser.add_argument('--delivery-workers', type=int, default=8)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='файл для JSON с результатом')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.disable(logging.CRITICAL)
+    result = json.dumps(run(args), ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='UTF-8') as file:
+            file.write(result + '\n')
+    print(result)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""Накладные расходы очереди опроса DueQueue на 100k заданий.
+
+Запуск: python benchmarks/bench_scheduler.py [количество заданий]
+"""
+import random
+import sys
+import time
+from os.path import abspath, dirname
+
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+
+from scheduler import DueQueue  # noqa: E402
+
+
+def measure(name, count, func):
+    started = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - started
+    print(f'{name:<12} {elapsed * 1000:9.1f} ms  '
+          f'{elapsed / count * 1e6:7.2f} us/op')
+
+
+def main(count):
+    rng = random.Random(0)
+    queue = DueQueue()
+    keys = [f'token{number}' for number in range(count)]
+
+    def insert():
+        for key in keys:
+            queue.push(key, rng.uniform(0, 600))
+
+    def reschedule():
+        for key in keys:
+            queue.push(key, rng.uniform(600, 1200))
+
+    def cancel():
+        for key in keys[::10]:
+            queue.cancel(key)
+
+    def pop():
+        now = 0
+        while len(queue):
+            now += 1
+            queue.pop_due(now)
+
+    def next_due():
+        for _ in range(count):
+            queue.next_due()
+
+    print(f'Заданий: {count}')
+    measure('insert', count, insert)
+    measure('reschedule', count, reschedule)
+    measure('cancel', count // 10, cancel)
+    measure('next_due', count, next_due)
+    measure('pop_due', count - count // 10, pop)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,83 @@
+"""Память на одну отслеживаемую работу: словари против HomeworkStates.
+
+Запуск: python benchmarks/bench_state_memory.py [работ] [работ на подписку]
+"""
+import gc
+import sys
+import tracemalloc
+from os.path import abspath, dirname
+
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+
+from state import HomeworkStates  # noqa: E402
+
+STATUSES = ('reviewing', 'rejected', 'approved')
+DATE = '2020-02-13T14:40:57Z'
+
+
+def homework_name(number, per_subscription, with_names):
+    """Название работы; строится заново, как при разборе ответа API."""
+    if not with_names:
+        return None
+    return f'student{number // per_subscription}__hw{number:02}.zip'
+
+
+def build_dicts(subscriptions, per_subscription, with_names):
+    return [
+        {
+            str(number): {
+                'homework_name': homework_name(
+                    number, per_subscription, with_names),
+                'status': STATUSES[number % 3],
+                'date_updated': DATE,
+            }
+            for number in range(base, base + per_subscription)
+        }
+        for base in range(0, subscriptions * per_subscription,
+                          per_subscription)
+    ]
+
+
+def build_states(subscriptions, per_subscription, with_names):
+    states = []
+    for base in range(0, subscriptions * per_subscription, per_subscription):
+        homeworks = HomeworkStates()
+        for number in range(base, base + per_subscription):
+            homeworks.set(
+                number, STATUSES[number % 3],
+                homework_name(number, per_subscription, with_names), DATE)
+        states.append(homeworks)
+    return states
+
+
+def measure(build, *args):
+    gc.collect()
+    tracemalloc.start()
+    data = build(*args)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del data
+    return size
+
+
+def main(total, per_subscription):
+    subscriptions = total // per_subscription
+    total = subscriptions * per_subscription
+    names_size = sum(
+        sys.getsizeof(homework_name(number, per_subscription, True))
+        for number in range(total))
+    print(f'Работ: {total}, подписок: {subscriptions}')
+    for label, with_names in (('без названий', False),
+                              ('с названиями', True)):
+        print(label)
+        for name, build in (('dict', build_dicts),
+                            ('HomeworkStates', build_states)):
+            size = measure(build, subscriptions, per_subscription, with_names)
+            print(f'  {name:<16} {size / total:8.1f} байт/работу')
+    print(f'из них сами строки названий: {names_size / total:.1f} байт/работу')
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    main(int(args[0]) if args else 1_000_000,
+         int(args[1]) if len(args) > 1 else 20)
@@ -0,0 +1,104 @@
+import random
+import threading
+import time
+
+import exceptions
+
+
+class CircuitBreaker:
+    """Предохранитель для запросов к API Практикума.
+
+    Общий на все подписки процесса: доля ошибок считается по всем
+    запросам в окне `window` секунд. Когда она превышает
+    `failure_ratio`, предохранитель размыкается и запросы сразу
+    завершаются `CircuitOpenError`. Время размыкания растёт по схеме
+    decorrelated jitter, после него пропускается пробный запрос.
+
+    Ошибками считаются только сбои соединения, таймауты и ответы 5xx:
+    ответ 4xx на неверный или отозванный токен одного пользователя
+    говорит о работающем API и не размыкает цепь для всех.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    FAILURES = (exceptions.ConnectinError, exceptions.InvalidResponseCode)
+
+    def __init__(self, failure_ratio=0.5, min_calls=10, window=60,
+                 base_delay=5, max_delay=600):
+        self.failure_ratio = failure_ratio
+        self.min_calls = min_calls
+        self.window = window
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.state = self.CLOSED
+        self._lock = threading.Lock()
+        self._delay = base_delay
+        self._opened_until = 0
+        self._probe_in_flight = False
+        self._reset_window(time.monotonic())
+
+    def _reset_window(self, now):
+        self._window_start = now
+        self._calls = 0
+        self._failures = 0
+
+    def _next_delay(self):
+        self._delay = min(
+            self.max_delay, random.uniform(self.base_delay, self._delay * 3))
+        return self._delay
+
+    def before_call(self):
+        """Проверить, можно ли выполнить запрос."""
+        with self._lock:
+            now = time.monotonic()
+            if self.state == self.OPEN and now >= self._opened_until:
+                self.state = self.HALF_OPEN
+            if self.state == self.CLOSED:
+                if now - self._window_start >= self.window:
+                    self._reset_window(now)
+                return
+            if self.state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return
+        raise exceptions.CircuitOpenError(
+            'Запросы к API приостановлены после серии ошибок')
+
+    def record_success(self):
+        """Учесть успешный запрос."""
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self.state = self.CLOSED
+                self._probe_in_flight = False
+                self._delay = self.base_delay
+                self._reset_window(time.monotonic())
+            self._calls += 1
+
+    def record_failure(self):
+        """Учесть ошибку запроса."""
+        with self._lock:
+            now = time.monotonic()
+            self._calls += 1
+            self._failures += 1
+            if self.state == self.HALF_OPEN or (
+                    self._calls >= self.min_calls
+                    and self._failures / self._calls >= self.failure_ratio):
+                self.state = self.OPEN
+                self._probe_in_flight = False
+                self._opened_until = now + self._next_delay()
+                self._reset_window(now)
+
+    def call(self, func, *args, **kwargs):
+        """Выполнить запрос через предохранитель."""
+        self.before_call()
+        try:
+            result = func(*args, **kwargs)
+        except self.FAILURES:
+            self.record_failure()
+            raise
+        except BaseException:
+            self.record_success()
+            raise
+        self.record_success()
+        return result
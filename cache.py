@@ -0,0 +1,103 @@
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+
+CURRENT_DATE = re.compile(rb'(?<!\\)"current_date"\s*:\s*-?\d+')
+
+
+class CacheEntry:
+    """Метаданные последнего ответа API для условного запроса."""
+
+    __slots__ = ('etag', 'last_modified', 'digest', 'expires_at')
+
+    def __init__(self, etag, last_modified, digest, expires_at):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.digest = digest
+        self.expires_at = expires_at
+
+    def conditional_headers(self):
+        """Заголовки If-None-Match/If-Modified-Since для запроса."""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+def body_digest(content):
+    """Короткий хеш тела ответа без поля current_date.
+
+    API возвращает в current_date время ответа, поэтому хеш всего тела
+    менялся бы при каждом запросе, даже если работы те же.
+    """
+    return hashlib.blake2b(
+        CURRENT_DATE.sub(b'', content), digest_size=16).digest()
+
+
+class ResponseCache:
+    """LRU-кеш ответов API с ограничением времени жизни.
+
+    Ключ - пара (токен, from_date). Хранится не тело ответа,
+    а только ETag, Last-Modified и хеш тела.
+    """
+
+    def __init__(self, max_entries=10000, ttl=3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Вернуть актуальную запись или None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def store(self, key, response):
+        """Запомнить ответ; возвращает True, если тело не изменилось."""
+        digest = body_digest(response.content)
+        entry = CacheEntry(
+            response.headers.get('ETag'),
+            response.headers.get('Last-Modified'),
+            digest,
+            time.monotonic() + self.ttl,
+        )
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            self._entries[key] = entry
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            unchanged = previous is not None and previous.digest == digest
+            if unchanged:
+                self.hits += 1
+            else:
+                self.misses += 1
+            return unchanged
+
+    def discard(self, key):
+        """Забыть ответ: следующий запрос будет безусловным."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def not_modified(self, key):
+        """Учесть ответ 304 и продлить жизнь записи."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.expires_at = time.monotonic() + self.ttl
+            self.hits += 1
+
+    def __len__(self):
+        return len(self._entries)
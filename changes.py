@@ -0,0 +1,38 @@
+class StatusChange:
+    """Переход работы из одного статуса в другой."""
+
+    __slots__ = ('key', 'homework', 'old_status', 'new_status')
+
+    def __init__(self, key, homework, old_status, new_status):
+        self.key = key
+        self.homework = homework
+        self.old_status = old_status
+        self.new_status = new_status
+
+    def __repr__(self):
+        return (f'StatusChange({self.key!r}, '
+                f'{self.old_status!r} -> {self.new_status!r})')
+
+
+def homework_key(homework):
+    """Ключ работы: id из ответа API или её название."""
+    return str(homework.get('id', homework.get('homework_name')))
+
+
+def detect_changes(statuses, homeworks):
+    """Найти переходы статусов в ответе API.
+
+    `statuses` - словарь ключ работы -> последний известный статус.
+    API с from_date присылает только изменившиеся работы, поэтому
+    проход по ответу линеен по числу изменений. Работы в ответе идут
+    от новых к старым, события возвращаются в хронологическом порядке.
+    """
+    changes = {}
+    for homework in reversed(homeworks):
+        key = homework_key(homework)
+        status = homework.get('status')
+        old_status = statuses.get(key)
+        changes.pop(key, None)
+        if old_status != status:
+            changes[key] = StatusChange(key, homework, old_status, status)
+    return list(changes.values())
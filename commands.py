@@ -0,0 +1,195 @@
+import time
+from datetime import datetime, timezone
+
+import metrics
+from subscriptions import save_subscription
+
+HELP = (
+    '/status - последние статусы работ\n'
+    '/subscribe <токен> - подписаться на статусы\n'
+    '/pause - приостановить уведомления, /resume - возобновить\n'
+    '/history [N] - последние N изменений\n'
+    '/stats - время на проверке, отклонения и срок проверки работ'
+)
+
+
+def mask_token(token):
+    """Токен для ответа в чат: видны только последние символы."""
+    return f'…{token[-4:]}'
+
+
+def format_date(timestamp):
+    """Время изменения статуса для ответа в чат."""
+    if not timestamp:
+        return '—'
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime(
+        '%Y-%m-%d %H:%M UTC')
+
+
+def format_duration(seconds):
+    """Длительность для ответа в чат: дни, часы и минуты."""
+    minutes = int(seconds) // 60
+    days, minutes = divmod(minutes, 24 * 60)
+    hours, minutes = divmod(minutes, 60)
+    if days:
+        return f'{days} д {hours} ч'
+    return f'{hours} ч {minutes} мин'
+
+
+class CommandService:
+    """Ответы на команды бота из состояния подписок в памяти.
+
+    API Практикума при этом не вызывается: статусы берутся из
+    HomeworkStates, которые обновляет цикл опроса.
+    """
+
+    def __init__(self, registry, subscriptions_file=None, history_size=10,
+                 history=None):
+        self.registry = registry
+        self.status_history = history
+        self.subscriptions_file = subscriptions_file
+        self.history_size = history_size
+        self.commands = {
+            'start': self.help,
+            'help': self.help,
+            'status': self.status,
+            'subscribe': self.subscribe,
+            'pause': self.pause,
+            'resume': self.resume,
+            'history': self.history,
+            'stats': self.stats,
+        }
+
+    @metrics.timed('handle_command')
+    def handle(self, chat_id, command, args=()):
+        """Ответ на команду чата."""
+        handler = self.commands.get(command, self.help)
+        return handler(chat_id, list(args))
+
+    def help(self, chat_id, args):
+        """Список команд."""
+        return HELP
+
+    def status(self, chat_id, args):
+        """Последний статус каждой работы подписок чата."""
+        subscriptions = self.registry.for_chat(chat_id)
+        if not subscriptions:
+            return 'Подписок нет. Подпишитесь: /subscribe <токен>'
+        lines = []
+        for subscription in subscriptions:
+            state = ' (пауза)' if subscription.paused else ''
+            lines.append(f'Токен {mask_token(subscription.token)}{state}:')
+            records = sorted(
+                subscription.statuses.records(),
+                key=lambda record: record[3], reverse=True)
+            if not records:
+                lines.append('  изменений статусов пока не было')
+            for key, name, status, _ in records:
+                lines.append(f'  {name or key}: {status}')
+        return '\n'.join(lines)
+
+    def subscribe(self, chat_id, args):
+        """Подписать чат на статусы работ по токену."""
+        if len(args) != 1:
+            return 'Использование: /subscribe <токен>'
+        token = args[0]
+        if self.registry.get(token, chat_id) is not None:
+            return 'Чат уже подписан на этот токен'
+        self.registry.add(token, chat_id, int(time.time()))
+        if self.subscriptions_file:
+            save_subscription(self.subscriptions_file, token, chat_id)
+        return f'Подписка на токен {mask_token(token)} оформлена'
+
+    def _set_paused(self, chat_id, paused):
+        subscriptions = self.registry.for_chat(chat_id)
+        for subscription in subscriptions:
+            subscription.paused = paused
+        return len(subscriptions)
+
+    def pause(self, chat_id, args):
+        """Приостановить опрос подписок чата."""
+        if not self._set_paused(chat_id, True):
+            return 'Подписок нет'
+        return 'Уведомления приостановлены, /resume - возобновить'
+
+    def resume(self, chat_id, args):
+        """Возобновить опрос подписок чата."""
+        if not self._set_paused(chat_id, False):
+            return 'Подписок нет'
+        return 'Уведомления возобновлены'
+
+    def history(self, chat_id, args):
+        """Последние изменения статусов по всем подпискам чата."""
+        try:
+            size = int(args[0]) if args else self.history_size
+        except ValueError:
+            return 'Использование: /history [N]'
+        records = sorted(
+            self._changes(chat_id), key=lambda record: record[3],
+            reverse=True)[:max(1, size)]
+        if not records:
+            return 'Изменений статусов пока не было'
+        return '\n'.join(
+            f'{format_date(updated)} {name or key}: {status}'
+            for key, name, status, updated in records)
+
+    def _changes(self, chat_id):
+        """Переходы статусов подписок чата: (ключ, название, статус, время).
+
+        С историей статусов это все записанные переходы, новые первыми
+        при равном времени; без неё - последний статус каждой работы.
+        """
+        for subscription in self.registry.for_chat(chat_id):
+            if self.status_history is None:
+                yield from subscription.statuses.records()
+                continue
+            for event in reversed(
+                    self.status_history.events(subscription.token)):
+                yield event['k'], event['n'], event['s'], event['at']
+
+    def stats(self, chat_id, args):
+        """Агрегаты истории статусов по работам подписок чата."""
+        if self.status_history is None:
+            return 'История статусов не ведётся'
+        lines = []
+        for subscription in self.registry.for_chat(chat_id):
+            names = {key: name for key, name, _, _
+                     in subscription.statuses.records()}
+            for key, stats in self.status_history.stats(
+                    subscription.token).items():
+                reviewing = format_duration(stats['reviewing_seconds'])
+                line = (f'{names.get(key) or key}: на проверке {reviewing}, '
+                        f'отклонений {stats["rejections"]}')
+                if stats['turnaround_seconds'] is not None:
+                    line += (', проверена за '
+                             + format_duration(stats['turnaround_seconds']))
+                lines.append(line)
+        return '\n'.join(lines) or 'Истории статусов пока нет'
+
+
+def start_commands(token, service, webhook_url=None, listen='0.0.0.0',
+                   port=8443):
+    """Принимать команды через webhook или long polling getUpdates.
+
+    Обработка идёт в потоках Updater, поэтому опрос Практикума
+    продолжается параллельно. Возвращает Updater для остановки.
+    """
+    from telegram.ext import CommandHandler, Updater
+
+    updater = Updater(token=token, use_context=True)
+
+    def reply(update, context):
+        command = update.effective_message.text.split()[0][1:]
+        text = service.handle(
+            update.effective_chat.id, command.split('@')[0], context.args)
+        update.effective_message.reply_text(text)
+
+    updater.dispatcher.add_handler(
+        CommandHandler(list(service.commands), reply))
+    if webhook_url:
+        updater.start_webhook(
+            listen=listen, port=port, url_path=token,
+            webhook_url=f'{webhook_url.rstrip("/")}/{token}')
+    else:
+        updater.start_polling(drop_pending_updates=True)
+    return updater
@@ -0,0 +1,73 @@
+import os
+import re
+
+TELEGRAM_TOKEN_PATTERN = re.compile(r'^\d+:[\w-]+$')
+CHAT_ID_PATTERN = re.compile(r'^-?\d+$')
+LINE_PATTERN = re.compile(
+    r'^\s*(?:export\s+)?([A-Za-z_][A-Za-z0-9_]*)\s*=\s*(.*?)\s*$')
+
+
+def find_env_file(name='.env', start=None):
+    """Найти файл окружения в текущем каталоге или выше."""
+    directory = os.path.abspath(start or os.getcwd())
+    while True:
+        path = os.path.join(directory, name)
+        if os.path.isfile(path):
+            return path
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return None
+        directory = parent
+
+
+def is_simple_value(value):
+    """Можно ли разобрать значение без python-dotenv."""
+    if '${' in value or (value[:1] == '"' and '\\' in value):
+        return False
+    if value[:1] in ('"', "'"):
+        return len(value) > 1 and value.endswith(value[0])
+    return True
+
+
+def parse_value(value):
+    """Значение из строки .env: без кавычек и комментария в конце."""
+    if value[:1] in ('"', "'"):
+        return value[1:-1]
+    return value.split(' #', 1)[0].rstrip()
+
+
+def load_env(path=None, override=False):
+    """Загрузить переменные из .env без импорта python-dotenv.
+
+    Поддерживаются строки `KEY=value`, `export KEY=value`, кавычки
+    и комментарии. Если в файле есть подстановки `${...}` или
+    многострочные значения, файл читает python-dotenv.
+    """
+    path = path or find_env_file()
+    if path is None:
+        return False
+    with open(path, encoding='UTF-8') as file:
+        lines = file.read().splitlines()
+    values = {}
+    for line in lines:
+        if not line.strip() or line.lstrip().startswith('#'):
+            continue
+        match = LINE_PATTERN.match(line)
+        if match is None or not is_simple_value(match.group(2)):
+            from dotenv import load_dotenv
+            return load_dotenv(path, override=override)
+        values[match.group(1)] = parse_value(match.group(2))
+    for key, value in values.items():
+        if override or key not in os.environ:
+            os.environ[key] = value
+    return True
+
+
+def validate_tokens(telegram_token, chat_id):
+    """Ошибки формата токена бота и id чата; пустой список - всё верно."""
+    errors = []
+    if telegram_token and not TELEGRAM_TOKEN_PATTERN.match(telegram_token):
+        errors.append('TELEGRAM_TOKEN должен иметь вид <число>:<ключ>')
+    if chat_id and not CHAT_ID_PATTERN.match(str(chat_id)):
+        errors.append('TELEGRAM_CHAT_ID должен быть целым числом')
+    return errors
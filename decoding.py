@@ -0,0 +1,112 @@
+import json
+import sys
+
+import exceptions
+import metrics
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Ошибки всех декодеров сводятся к ConnectinError. С json из стандартной
+# библиотеки работы остаются словарями: пересборка в HomeworkRecord
+# съела бы весь выигрыш, ради которого он нужен с быстрыми декодерами.
+DECODE_ERRORS = (ValueError,)
+COMPACT_RECORDS = True
+if msgspec is not None:
+    loads = msgspec.json.Decoder().decode
+    DECODE_ERRORS += (msgspec.DecodeError,)
+elif orjson is not None:
+    loads = orjson.loads
+else:
+    loads = json.loads
+    COMPACT_RECORDS = False
+
+
+class HomeworkRecord:
+    """Работа из ответа API: только поля, которые нужны боту.
+
+    Поддерживает `in` и `get`, как словарь, поэтому подходит
+    для `parse_status` и `detect_changes`.
+    """
+
+    __slots__ = ('id', 'homework_name', 'status', 'date_updated')
+
+    def __init__(self, id, homework_name, status, date_updated=None):
+        self.id = id
+        self.homework_name = homework_name
+        self.status = status
+        self.date_updated = date_updated
+
+    def get(self, key, default=None):
+        """Значение поля или `default`, если его нет."""
+        value = getattr(self, key, None) if key in self.__slots__ else None
+        return default if value is None else value
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __repr__(self):
+        return f'HomeworkRecord({self.homework_name!r}, {self.status!r})'
+
+
+class StatusesResponse:
+    """Разобранный ответ homework_statuses."""
+
+    __slots__ = ('homeworks', 'current_date')
+
+    def __init__(self, homeworks, current_date):
+        self.homeworks = homeworks
+        self.current_date = current_date
+
+
+@metrics.timed('decode_response')
+def decode_response(content, known_statuses=None):
+    """Декодировать и проверить ответ API за один проход.
+
+    Исключения те же, что у `check_response` и `parse_status`.
+    """
+    try:
+        data = loads(content)
+    except DECODE_ERRORS as error:
+        raise exceptions.ConnectinError(
+            f'Ответ API не является JSON: {error}') from error
+    if not isinstance(data, dict):
+        raise TypeError('Ошибка в типе ответа API')
+    homeworks = data.get('homeworks')
+    current_date = data.get('current_date')
+    if homeworks is None or current_date is None:
+        raise exceptions.EmptyResponseFromAPI('Пустой ответ от API')
+    if not isinstance(homeworks, list):
+        raise KeyError('Homeworks не является списком')
+    return StatusesResponse(
+        check_homeworks(homeworks, known_statuses), current_date)
+
+
+def check_homeworks(homeworks, known_statuses=None):
+    """Проверить работы ответа; вернуть записи HomeworkRecord.
+
+    Без `COMPACT_RECORDS` возвращает те же словари после проверки.
+    """
+    records = [] if COMPACT_RECORDS else None
+    for homework in homeworks:
+        if not isinstance(homework, dict):
+            raise TypeError('Работа в ответе API не является словарём')
+        name = homework.get('homework_name')
+        if name is None:
+            raise KeyError('В ответе отсутсвует ключ homework_name')
+        status = homework.get('status')
+        if known_statuses is not None and status not in known_statuses:
+            raise ValueError(f'Неизвестный статус работы - {status}')
+        if records is not None:
+            records.append(HomeworkRecord(
+                homework.get('id'), name,
+                sys.intern(status) if isinstance(status, str) else status,
+                homework.get('date_updated')))
+    return homeworks if records is None else records
@@ -0,0 +1,214 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+import metrics
+
+MAX_MESSAGE_LENGTH = 4096
+
+
+class TokenBucket:
+    """Ограничитель частоты: `rate` событий в секунду с запасом `capacity`."""
+
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated')
+
+    def __init__(self, rate, capacity=1, now=None):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic() if now is None else now
+
+    def _refill(self, now):
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now):
+        """Сколько ждать до появления свободного токена."""
+        self._refill(now)
+        return 0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self, now):
+        """Забрать токен; возвращает False, если его нет."""
+        if self.delay(now):
+            return False
+        self.tokens -= 1
+        return True
+
+
+class DeliveryQueue:
+    """Очередь исходящих сообщений в Telegram.
+
+    Частота ограничена для каждого чата и для бота в целом,
+    накопившиеся для одного чата тексты склеиваются в одно сообщение.
+    Объект повторяет интерфейс `send_message` бота, поэтому его можно
+    передавать вместо бота в `send_to_chat`. Необязательный `on_done`
+    вызывается с True после отправки или с False после отказа.
+    """
+
+    def __init__(self, bot, chat_rate=1, global_rate=30, max_attempts=5,
+                 workers=4):
+        self.bot = bot
+        self.workers = workers
+        self.chat_rate = chat_rate
+        self.max_attempts = max_attempts
+        self._global = TokenBucket(global_rate, capacity=global_rate)
+        self._buckets = {}
+        self._pending = {}
+        self._attempts = {}
+        self._heap = []
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._closed = False
+        self._threads = []
+        self.sent = 0
+
+    def send_message(self, chat_id=None, text=None, on_done=None, **kwargs):
+        """Поставить сообщение в очередь отправки."""
+        with self._condition:
+            if self._closed:
+                raise RuntimeError('Очередь отправки закрыта')
+            texts = self._pending.get(chat_id)
+            if texts is None:
+                self._pending[chat_id] = [(text, on_done)]
+                self._schedule(chat_id, time.monotonic())
+                self._condition.notify()
+            else:
+                texts.append((text, on_done))
+
+    def pending(self):
+        """Количество чатов, ожидающих отправки."""
+        with self._condition:
+            return len(self._pending)
+
+    def _schedule(self, chat_id, ready_at):
+        heapq.heappush(self._heap, (ready_at, next(self._counter), chat_id))
+
+    def _bucket(self, chat_id):
+        bucket = self._buckets.get(chat_id)
+        if bucket is None:
+            bucket = self._buckets[chat_id] = TokenBucket(self.chat_rate)
+        return bucket
+
+    def _next_batch(self):
+        """Дождаться чата, которому можно отправить, и забрать тексты.
+
+        Чат, у которого исчерпан лимит частоты, переносится в куче на
+        время появления токена, чтобы не задерживать готовые чаты.
+        """
+        while True:
+            if not self._heap:
+                if self._closed:
+                    return None, None
+                self._condition.wait()
+                continue
+            now = time.monotonic()
+            ready_at, _, chat_id = self._heap[0]
+            bucket = self._bucket(chat_id)
+            chat_delay = bucket.delay(now)
+            if ready_at <= now and chat_delay > 0:
+                heapq.heapreplace(self._heap, (
+                    now + chat_delay, next(self._counter), chat_id))
+                continue
+            wait = max(ready_at - now, self._global.delay(now))
+            if wait > 0:
+                self._condition.wait(wait)
+                continue
+            heapq.heappop(self._heap)
+            bucket.take(now)
+            self._global.take(now)
+            return chat_id, self._coalesce(chat_id)
+
+    def _coalesce(self, chat_id):
+        texts = self._pending[chat_id]
+        length = len(texts[0][0])
+        count = 1
+        while (count < len(texts)
+               and length + 2 + len(texts[count][0]) <= MAX_MESSAGE_LENGTH):
+            length += 2 + len(texts[count][0])
+            count += 1
+        batch, self._pending[chat_id] = texts[:count], texts[count:]
+        return batch
+
+    def _finish(self, chat_id, sent=0, retry=(), retry_after=0):
+        """Учесть результат отправки и запланировать остаток чата."""
+        with self._condition:
+            self.sent += sent
+            if not retry:
+                self._attempts.pop(chat_id, None)
+            texts = self._pending[chat_id]
+            texts[:0] = retry
+            if texts:
+                now = time.monotonic()
+                self._schedule(chat_id, now + max(
+                    retry_after, self._bucket(chat_id).delay(now)))
+            else:
+                del self._pending[chat_id]
+
+    def _retry_allowed(self, chat_id):
+        with self._condition:
+            attempts = self._attempts.get(chat_id, 0) + 1
+            self._attempts[chat_id] = attempts
+            return attempts < self.max_attempts
+
+    @staticmethod
+    def _done(batch, sent):
+        for _, on_done in batch:
+            if on_done is not None:
+                on_done(sent)
+
+    @metrics.timed('send_message')
+    def _send(self, chat_id, text):
+        """Вызвать sendMessage бота; учитывает число и длительность."""
+        self.bot.send_message(chat_id=chat_id, text=text)
+
+    def _deliver(self, chat_id, batch):
+        from telegram.error import RetryAfter
+
+        try:
+            self._send(chat_id, '\n\n'.join(text for text, _ in batch))
+        except RetryAfter as error:
+            if self._retry_allowed(chat_id):
+                logging.warning(
+                    'Telegram просит подождать %s с', error.retry_after)
+                self._finish(chat_id, retry=batch,
+                             retry_after=error.retry_after)
+                return
+            logging.error('Сообщение в чат %s не отправлено', chat_id)
+        except Exception as error:
+            logging.error('Не удалось отправить сообщение %s', error)
+        else:
+            self._finish(chat_id, sent=len(batch))
+            self._done(batch, True)
+            return
+        self._finish(chat_id)
+        self._done(batch, False)
+
+    def run(self):
+        """Отправлять сообщения, пока очередь не закрыта и не пуста."""
+        while True:
+            with self._condition:
+                chat_id, batch = self._next_batch()
+            if chat_id is None and batch is None:
+                return
+            self._deliver(chat_id, batch)
+
+    def start(self):
+        """Запустить отправку в фоновых потоках."""
+        for number in range(self.workers):
+            thread = threading.Thread(
+                target=self.run, name=f'delivery-{number}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def close(self, timeout=None):
+        """Закрыть очередь и дождаться отправки остатка."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(None if deadline is None
+                        else max(0, deadline - time.monotonic()))
@@ -18,6 +18,11 @@ class ConnectinError(Exception):
     pass
 
 
+class RequestRejected(Exception):
+    """API отклонил запрос с кодом 4xx, например из-за неверного токена."""
+    pass
+
+
 class EmptyResponseFromAPI(NotForSending):
     """Пустой ответ от API."""
     pass
@@ -26,3 +31,8 @@ class EmptyResponseFromAPI(NotForSending):
 class TelegramError(NotForSending):
     """Ошибка телеграма."""
     pass
+
+
+class CircuitOpenError(NotForSending):
+    """API временно недоступен, запросы не отправляются."""
+    pass
@@ -0,0 +1,314 @@
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from array import array
+from datetime import datetime, timezone
+
+from sharding import token_hash
+
+EVENTS_SUFFIX = '.jsonl'
+INDEX_SUFFIX = '.idx'
+AGGREGATES_FILE = 'aggregates.json'
+ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+
+
+def partition_name(timestamp, partition_format='%Y%m%d'):
+    """Имя раздела журнала для времени события (UTC)."""
+    return _hour_partition(
+        int(timestamp) - int(timestamp) % 3600, partition_format)
+
+
+@functools.lru_cache(maxsize=1024)
+def _hour_partition(hour, partition_format):
+    return datetime.fromtimestamp(hour, timezone.utc).strftime(
+        partition_format)
+
+
+class HomeworkStats:
+    """Агрегаты по одной работе, обновляемые с каждым событием.
+
+    Время на проверке копится при выходе из статуса reviewing,
+    отклонения считаются по переходам в rejected, срок проверки -
+    от первого события до одобрения.
+    """
+
+    __slots__ = (
+        'status', 'entered_at', 'reviewing_seconds', 'rejections',
+        'first_at', 'approved_at', 'events',
+    )
+
+    def __init__(self, status=None, entered_at=0, reviewing_seconds=0,
+                 rejections=0, first_at=0, approved_at=0, events=0):
+        self.status = status
+        self.entered_at = entered_at
+        self.reviewing_seconds = reviewing_seconds
+        self.rejections = rejections
+        self.first_at = first_at
+        self.approved_at = approved_at
+        self.events = events
+
+    def apply(self, status, at):
+        """Учесть переход работы в статус `status` в момент `at`."""
+        if self.status == 'reviewing' and self.entered_at:
+            self.reviewing_seconds += max(0, at - self.entered_at)
+        if status == 'rejected':
+            self.rejections += 1
+        if status == 'approved' and not self.approved_at:
+            self.approved_at = at
+        self.first_at = self.first_at or at
+        self.status = status
+        self.entered_at = at
+        self.events += 1
+
+    def to_list(self):
+        """Агрегаты в виде списка для снимка."""
+        return [getattr(self, name) for name in self.__slots__]
+
+    def as_dict(self, now=None):
+        """Агрегаты для ответа на запрос."""
+        reviewing = self.reviewing_seconds
+        if self.status == 'reviewing' and self.entered_at:
+            reviewing += max(0, (now or time.time()) - self.entered_at)
+        return {
+            'status': self.status,
+            'reviewing_seconds': reviewing,
+            'rejections': self.rejections,
+            'turnaround_seconds': (
+                self.approved_at - self.first_at
+                if self.approved_at else None),
+            'events': self.events,
+        }
+
+
+class StatusHistory:
+    """Журнал переходов статусов с разделами по дням.
+
+    События дописываются в файлы `<раздел>.jsonl`; рядом лежит индекс
+    `<раздел>.idx` со смещениями событий по хешу токена, поэтому
+    история одного токена читается без полного просмотра. Агрегаты по
+    работам обновляются при записи и сохраняются снимком; при запуске
+    дочитывается только хвост журнала после снимка.
+    """
+
+    def __init__(self, directory, flush_interval=5, snapshot_interval=60,
+                 partition_format='%Y%m%d'):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.snapshot_interval = snapshot_interval
+        self._snapshot_at = time.monotonic()
+        self._unsaved = False
+        self.partition_format = partition_format
+        self._lock = threading.Lock()
+        self._pending = []
+        self._index = {}
+        self._stats = {}
+        self._applied = {}
+        self._stop = threading.Event()
+        self._thread = None
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    def _path(self, partition, suffix):
+        return os.path.join(self.directory, f'{partition}{suffix}')
+
+    def _partitions(self):
+        return sorted(
+            name[:-len(EVENTS_SUFFIX)] for name in os.listdir(self.directory)
+            if name.endswith(EVENTS_SUFFIX))
+
+    def _apply(self, event):
+        homeworks = self._stats.setdefault(event['t'], {})
+        stats = homeworks.get(event['k'])
+        if stats is None:
+            stats = homeworks[event['k']] = HomeworkStats()
+        stats.apply(event['s'], event['at'])
+
+    def _add_to_index(self, hashed, partition, offset):
+        offsets = self._index.setdefault(hashed, {}).get(partition)
+        if offsets is None:
+            offsets = self._index[hashed][partition] = array('q')
+        offsets.append(offset)
+
+    def record(self, token, key, name, old_status, new_status, at=None):
+        """Записать переход статуса работы и обновить агрегаты.
+
+        Повтор уже учтённого перехода (тот же статус и время) не пишется:
+        так подписки одного токена из разных чатов не удваивают историю.
+        Возвращает True, если событие записано.
+        """
+        event = {
+            't': token_hash(token), 'k': str(key), 'n': name,
+            'o': old_status, 's': new_status,
+            'at': int(at or time.time()),
+        }
+        with self._lock:
+            stats = self._stats.get(event['t'], {}).get(event['k'])
+            if (stats is not None and stats.status == new_status
+                    and stats.entered_at == event['at']):
+                return False
+            self._apply(event)
+            self._pending.append(event)
+        return True
+
+    def flush(self, snapshot=False):
+        """Дописать накопленные события в разделы и индексы.
+
+        Снимок агрегатов сохраняется не чаще `snapshot_interval`.
+        """
+        with self._lock:
+            events, self._pending = self._pending, []
+            partitions = {}
+            for event in events:
+                partitions.setdefault(
+                    partition_name(event['at'], self.partition_format),
+                    []).append(event)
+            for partition, items in partitions.items():
+                self._append(partition, items)
+            self._unsaved = self._unsaved or bool(events)
+            if self._unsaved and (snapshot or time.monotonic()
+                                  - self._snapshot_at
+                                  >= self.snapshot_interval):
+                self._save_aggregates()
+                self._snapshot_at = time.monotonic()
+                self._unsaved = False
+
+    def _append(self, partition, events):
+        index_lines = []
+        with open(self._path(partition, EVENTS_SUFFIX), 'ab') as file:
+            offset = file.tell()
+            for event in events:
+                line = (ENCODER.encode(event) + '\n').encode()
+                file.write(line)
+                self._add_to_index(event['t'], partition, offset)
+                index_lines.append(f'{event["t"]} {offset}\n')
+                offset += len(line)
+            file.flush()
+            os.fsync(file.fileno())
+        with open(self._path(partition, INDEX_SUFFIX), 'a') as file:
+            file.writelines(index_lines)
+        self._applied[partition] = offset
+
+    def _save_aggregates(self):
+        path = os.path.join(self.directory, AGGREGATES_FILE)
+        with open(f'{path}.tmp', 'w', encoding='UTF-8') as file:
+            file.write(json.dumps({
+                'applied': self._applied,
+                'stats': {
+                    hashed: {key: stats.to_list()
+                             for key, stats in homeworks.items()}
+                    for hashed, homeworks in self._stats.items()
+                },
+            }, ensure_ascii=False))
+        os.replace(f'{path}.tmp', path)
+
+    def _load(self):
+        """Прочитать индексы и снимок агрегатов, дочитать хвост журнала."""
+        path = os.path.join(self.directory, AGGREGATES_FILE)
+        if os.path.exists(path):
+            with open(path, encoding='UTF-8') as file:
+                snapshot = json.load(file)
+            self._applied = snapshot['applied']
+            self._stats = {
+                hashed: {key: HomeworkStats(*values)
+                         for key, values in homeworks.items()}
+                for hashed, homeworks in snapshot['stats'].items()
+            }
+        replayed = 0
+        for partition in self._partitions():
+            indexed = self._load_index(partition)
+            replayed += self._replay(partition, indexed)
+        if replayed:
+            logging.info('Дочитано событий истории: %d', replayed)
+
+    def _load_index(self, partition):
+        """Загрузить индекс раздела; вернуть смещения из него."""
+        indexed = set()
+        path = self._path(partition, INDEX_SUFFIX)
+        if not os.path.exists(path):
+            return indexed
+        with open(path) as file:
+            for line in file:
+                hashed, offset = line.split()
+                self._add_to_index(hashed, partition, int(offset))
+                indexed.add(int(offset))
+        return indexed
+
+    def _replay(self, partition, indexed):
+        """Учесть события раздела после снимка и достроить индекс."""
+        applied = self._applied.get(partition, 0)
+        start = min(applied, max(indexed, default=0))
+        missing = []
+        replayed = 0
+        with open(self._path(partition, EVENTS_SUFFIX), 'rb') as file:
+            file.seek(start)
+            offset = start
+            for line in file:
+                if line.endswith(b'\n'):
+                    event = json.loads(line)
+                    if offset not in indexed:
+                        self._add_to_index(event['t'], partition, offset)
+                        missing.append(f'{event["t"]} {offset}\n')
+                    if offset >= applied:
+                        self._apply(event)
+                        replayed += 1
+                offset += len(line)
+        if missing:
+            with open(self._path(partition, INDEX_SUFFIX), 'a') as file:
+                file.writelines(missing)
+        self._applied[partition] = offset
+        return replayed
+
+    def events(self, token, since=None, until=None):
+        """События токена в порядке записи, при желании за период."""
+        first = None if since is None else partition_name(
+            since, self.partition_format)
+        last = None if until is None else partition_name(
+            until, self.partition_format)
+        with self._lock:
+            partitions = dict(self._index.get(token_hash(token), {}))
+            pending = [event for event in self._pending
+                       if event['t'] == token_hash(token)]
+        result = []
+        for partition in sorted(partitions):
+            if (first and partition < first) or (last and partition > last):
+                continue
+            with open(self._path(partition, EVENTS_SUFFIX), 'rb') as file:
+                for offset in partitions[partition]:
+                    file.seek(offset)
+                    result.append(json.loads(file.readline()))
+        result.extend(pending)
+        return [
+            event for event in result
+            if (since is None or event['at'] >= since)
+            and (until is None or event['at'] <= until)
+        ]
+
+    def stats(self, token, now=None):
+        """Агрегаты по работам токена: ключ работы -> словарь."""
+        with self._lock:
+            homeworks = self._stats.get(token_hash(token), {})
+            return {key: stats.as_dict(now)
+                    for key, stats in homeworks.items()}
+
+    def start(self):
+        """Запустить фоновую запись событий."""
+        self._thread = threading.Thread(
+            target=self._run, name='history', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as error:
+                logging.error('Не удалось записать историю: %s', error)
+
+    def close(self):
+        """Остановить фоновую запись и сбросить остаток."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush(snapshot=True)
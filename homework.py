@@ -1,22 +1,89 @@
-import telegram
+import functools
 import time
-import requests
 import logging
 import sys
 import os
+import signal
+import threading
 import exceptions
-from dotenv import load_dotenv
+import metrics
+from log_config import setup_logging
+from breaker import CircuitBreaker
+from cache import ResponseCache
+from changes import detect_changes
+from commands import CommandService, start_commands
+from config import load_env, validate_tokens
+from decoding import decode_response
+from delivery import DeliveryQueue
+from history import StatusHistory
 from http import HTTPStatus
+from scheduler import (
+    POLL_QUEUE_DUE, POLL_QUEUE_SIZE, AdaptivePolicy, DueQueue)
+from session import PracticumSession
+from outbox import open_outbox
+from routing import Router, load_routes
+from sharding import ShardMember, run_supervisor, token_hash
+from singleflight import SingleFlight
+from state import HomeworkStates, parse_date
+from storage import open_state_store
+from subscriptions import SubscriptionRegistry, load_subscriptions
+from templates import MessageTemplates
 
-load_dotenv()
+load_env()
 
 PRACTICUM_TOKEN = os.getenv('PRACTICUM_TOKEN')
 TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
 TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
+SUBSCRIPTIONS_FILE = os.getenv('SUBSCRIPTIONS_FILE')
+POLLING_ENGINE = os.getenv('POLLING_ENGINE', 'sync')
+POLLING_CONCURRENCY = int(os.getenv('POLLING_CONCURRENCY', 100))
+POLLING_QUEUE_SIZE = int(os.getenv('POLLING_QUEUE_SIZE', 1000))
+POLLING_HOST_LIMITS = os.getenv('POLLING_HOST_LIMITS', '')
+PRACTICUM_POOL_SIZE = int(os.getenv('PRACTICUM_POOL_SIZE', 10))
+POLL_MIN_INTERVAL = int(os.getenv('POLL_MIN_INTERVAL', 60))
+POLL_MAX_INTERVAL = int(os.getenv('POLL_MAX_INTERVAL', 1800))
+POLL_JITTER = float(os.getenv('POLL_JITTER', 0.1))
+TELEGRAM_CHAT_RATE = float(os.getenv('TELEGRAM_CHAT_RATE', 1))
+TELEGRAM_GLOBAL_RATE = float(os.getenv('TELEGRAM_GLOBAL_RATE', 30))
+TELEGRAM_WORKERS = int(os.getenv('TELEGRAM_WORKERS', 4))
+BREAKER_FAILURE_RATIO = float(os.getenv('BREAKER_FAILURE_RATIO', 0.5))
+BREAKER_MIN_CALLS = int(os.getenv('BREAKER_MIN_CALLS', 10))
+BREAKER_MAX_DELAY = int(os.getenv('BREAKER_MAX_DELAY', 600))
+RESPONSE_CACHE_SIZE = int(os.getenv('RESPONSE_CACHE_SIZE', 10000))
+RESPONSE_CACHE_TTL = int(os.getenv('RESPONSE_CACHE_TTL', 3600))
+METRICS_PORT = int(os.getenv('METRICS_PORT', 0))
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text')
+LOG_FILE = os.getenv('LOG_FILE', 'log.txt')
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+LOG_MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', 10 * 1024 * 1024))
+LOG_BACKUP_COUNT = int(os.getenv('LOG_BACKUP_COUNT', 5))
+SHARD_WORKERS = os.getenv('SHARD_WORKERS', '0')
+SHARD_LEASE_PATH = os.getenv('SHARD_LEASE_PATH', 'shards.sqlite3')
+SHARD_LEASE_TTL = float(os.getenv('SHARD_LEASE_TTL', 30))
+STATE_BACKEND = os.getenv('STATE_BACKEND', 'sqlite')
+STATE_PATH = os.getenv('STATE_PATH', 'state.sqlite3')
+STATE_FLUSH_INTERVAL = float(os.getenv('STATE_FLUSH_INTERVAL', 5))
+COMMANDS_MODE = os.getenv('COMMANDS_MODE', 'off')
+WEBHOOK_URL = os.getenv('WEBHOOK_URL')
+WEBHOOK_LISTEN = os.getenv('WEBHOOK_LISTEN', '0.0.0.0')
+WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', os.getenv('PORT', 8443)))
+OUTBOX_BACKEND = os.getenv('OUTBOX_BACKEND', 'sqlite')
+OUTBOX_PATH = os.getenv('OUTBOX_PATH', 'outbox.sqlite3')
+OUTBOX_COMMIT_INTERVAL = float(os.getenv('OUTBOX_COMMIT_INTERVAL', 0.01))
+OUTBOX_REDELIVER_AFTER = float(os.getenv('OUTBOX_REDELIVER_AFTER', 60))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv('OUTBOX_MAX_ATTEMPTS', 5))
+HISTORY_PATH = os.getenv('HISTORY_PATH', 'history')
+SINGLEFLIGHT_LINGER = float(os.getenv('SINGLEFLIGHT_LINGER', 30))
+ROUTES_FILE = os.getenv('ROUTES_FILE')
+ROUTES_QUEUE_SIZE = int(os.getenv('ROUTES_QUEUE_SIZE', 1000))
+TEMPLATES_FILE = os.getenv('TEMPLATES_FILE')
+TEMPLATES_CACHE_SIZE = int(os.getenv('TEMPLATES_CACHE_SIZE', 4096))
+TEMPLATES_CHECK_INTERVAL = float(os.getenv('TEMPLATES_CHECK_INTERVAL', 5))
+
+SHUTDOWN_TIMEOUT = float(os.getenv('SHUTDOWN_TIMEOUT', 25))
 
 RETRY_TIME = 600
 ENDPOINT = 'https://practicum.yandex.ru/api/user_api/homework_statuses/'
-HEADERS = {'Authorization': f'OAuth {PRACTICUM_TOKEN}'}
 
 
 HOMEWORK_STATUSES = {
@@ -28,47 +95,107 @@ HOMEWORK_STATUSES = {
 
 def send_message(bot, message):
     """Отправляет сообщение в Telegram чат."""
+    send_to_chat(bot, TELEGRAM_CHAT_ID, message)
+
+
+def send_to_chat(bot, chat_id, message):
+    """Отправляет сообщение в указанный Telegram чат."""
     try:
         logging.info('Начало отправки')
         bot.send_message(
-            chat_id=TELEGRAM_CHAT_ID,
+            chat_id=chat_id,
             text=message,
         )
     except exceptions.TelegramError as error:
         raise exceptions.TelegramError(
             f'Не удалось отправить сообщение {error}')
     else:
-        logging.info(f'Сообщение отправлено {message}')
+        logging.info('Сообщение отправлено %s', message)
 
 
 def get_api_answer(current_timestamp):
     """Получить статус домашней работы."""
+    return request_statuses(PRACTICUM_TOKEN, current_timestamp)
+
+
+def request_statuses(token, current_timestamp, session=None, cache=None):
+    """Получить статусы домашних работ для токена.
+
+    С кешем запрос условный: если ответ не изменился с прошлого
+    запроса с тем же from_date, возвращается None.
+    """
+    homework_statuses = request_homework_statuses(
+        token, current_timestamp, session, cache)
+    if homework_statuses is None:
+        return None
+    try:
+        return homework_statuses.json()
+    except Exception as error:
+        raise exceptions.ConnectinError(
+            f'Ответ API не является JSON: {error}') from error
+
+
+def fetch_homeworks(token, current_timestamp, session=None, cache=None):
+    """Получить и разобрать статусы работ в записи HomeworkRecord.
+
+    Проверка ответа и статусов выполняется за один проход.
+    Возвращает None, если ответ не изменился.
+    """
+    homework_statuses = request_homework_statuses(
+        token, current_timestamp, session, cache)
+    if homework_statuses is None:
+        return None
+    return decode_response(homework_statuses.content, HOMEWORK_STATUSES)
+
+
+@metrics.timed('get_api_answer')
+def request_homework_statuses(token, current_timestamp, session=None,
+                              cache=None):
+    """Выполнить запрос статусов и вернуть HTTP-ответ."""
+    if session is None:
+        import requests
+
+        http_get = requests.get
+    else:
+        http_get = session.get
     timestamp = current_timestamp or int(time.time())
     params_request = {
         'url': ENDPOINT,
-        'headers': HEADERS,
+        'headers': {'Authorization': f'OAuth {token}'},
         'params': {'from_date': timestamp},
     }
+    key = (token, timestamp)
+    entry = cache.get(key) if cache is not None else None
+    if entry is not None:
+        params_request['headers'].update(entry.conditional_headers())
+    logging.info(
+        'Начало запроса: url = %s, params = %s',
+        ENDPOINT, params_request['params'])
     try:
-        logging.info(
-            'Начало запроса: url = {url},'
-            'headers = {headers},'
-            'params = {params}'.format(**params_request))
-        homework_statuses = requests.get(**params_request)
-        if homework_statuses.status_code != HTTPStatus.OK:
-            raise exceptions.InvalidResponseCode(
-                'Не удалось получить ответ API, '
-                f'ошибка: {homework_statuses.status_code}'
-                f'причина: {homework_statuses.reason}'
-                f'текст: {homework_statuses.text}')
-        return homework_statuses.json()
-    except Exception:
+        homework_statuses = http_get(**params_request)
+    except Exception as error:
         raise exceptions.ConnectinError(
-            'Не верный код ответа параметры запроса: url = {url},'
-            'headers = {headers},'
-            'params = {params}'.format(**params_request))
+            f'Сбой запроса к API: url = {ENDPOINT}, '
+            f'params = {params_request["params"]}, ошибка: {error}'
+        ) from error
+    if (entry is not None
+            and homework_statuses.status_code == HTTPStatus.NOT_MODIFIED):
+        cache.not_modified(key)
+        return None
+    if homework_statuses.status_code != HTTPStatus.OK:
+        error_class = exceptions.InvalidResponseCode
+        if 400 <= homework_statuses.status_code < 500:
+            error_class = exceptions.RequestRejected
+        raise error_class(
+            f'Не верный код ответа API: {homework_statuses.status_code} '
+            f'{getattr(homework_statuses, "reason", "")}, url = {ENDPOINT}, '
+            f'params = {params_request["params"]}')
+    if cache is not None and cache.store(key, homework_statuses):
+        return None
+    return homework_statuses
 
 
+@metrics.timed('check_response')
 def check_response(response):
     """Проверить валидность ответа."""
     logging.debug('Начало проверки')
@@ -82,20 +209,31 @@ def check_response(response):
     return homeworks
 
 
+@metrics.timed('parse_status')
 def parse_status(homework):
     """Распарсить ответ."""
+    return render_status(homework)
+
+
+def render_status(homework, chat_id=None):
+    """Текст уведомления о статусе работы на языке чата."""
     if 'homework_name' not in homework:
         raise KeyError('В ответе отсутсвует ключ homework_name')
     homework_name = homework.get('homework_name')
     homework_status = homework.get('status')
     if homework_status not in HOMEWORK_STATUSES:
         raise ValueError(f'Неизвестный статус работы - {homework_status}')
-    return(
-        'Изменился статус проверки работы "{homework_name}" {verdict}'
-    ).format(
-        homework_name=homework_name,
-        verdict=HOMEWORK_STATUSES[homework_status]
-    )
+    return MESSAGE_TEMPLATES.render(chat_id, homework_name, homework_status)
+
+
+MESSAGE_TEMPLATES = MessageTemplates(
+    path=TEMPLATES_FILE, cache_size=TEMPLATES_CACHE_SIZE)
+
+
+STATUS_CHANGES = metrics.REGISTRY.counter(
+    'bot_status_changes_total', 'Обнаруженные изменения статусов работ')
+POLL_LATENESS = metrics.REGISTRY.histogram(
+    'bot_poll_lateness_seconds', 'Опоздание опроса относительно срока')
 
 
 def check_tokens():
@@ -103,59 +241,491 @@ def check_tokens():
     return all([TELEGRAM_TOKEN, PRACTICUM_TOKEN, TELEGRAM_CHAT_ID])
 
 
+def build_registry(from_date, store=None):
+    """Собрать реестр подписок из файла или переменных окружения.
+
+    Курсоры и отправленные статусы восстанавливаются из хранилища;
+    записи, сохранённые по одному токену, подхватываются как есть.
+    """
+    registry = SubscriptionRegistry()
+    if SUBSCRIPTIONS_FILE:
+        load_subscriptions(SUBSCRIPTIONS_FILE, registry, from_date)
+    if PRACTICUM_TOKEN and TELEGRAM_CHAT_ID:
+        registry.add(PRACTICUM_TOKEN, TELEGRAM_CHAT_ID, from_date)
+    if store is not None:
+        cursors, statuses = store.load()
+        for subscription in registry:
+            apply_state(subscription, cursors, statuses, replace=True)
+    return registry
+
+
+def apply_state(subscription, cursors, statuses, replace=False):
+    """Применить к подписке курсор и статусы, прочитанные из хранилища.
+
+    Без `replace` курсор не сдвигается назад, а статусы заменяются
+    только сохранёнными.
+    """
+    from_date = cursors.get(
+        subscription.state_key, cursors.get(subscription.token))
+    stored = statuses.get(
+        subscription.state_key, statuses.get(subscription.token))
+    if replace:
+        if from_date is not None:
+            subscription.from_date = from_date
+        subscription.statuses = HomeworkStates(stored)
+        return
+    if from_date is not None:
+        subscription.from_date = max(subscription.from_date, from_date)
+    if stored:
+        subscription.statuses = HomeworkStates(stored)
+
+
+def reload_owned(registry, store, hashes):
+    """Перечитать состояние подписок, токены которых перешли к воркеру.
+
+    Прежний владелец сбросил курсоры и статусы в общее хранилище перед
+    тем, как отдать аренду; без перечитывания новый владелец опрашивал
+    бы с устаревшего курсора и повторял уже отправленные уведомления.
+    """
+    subscriptions = [
+        subscription for subscription in registry
+        if token_hash(subscription.token) in hashes]
+    if not subscriptions:
+        return
+    cursors, statuses = store.load_keys({
+        key for subscription in subscriptions
+        for key in (subscription.state_key, subscription.token)})
+    for subscription in subscriptions:
+        apply_state(subscription, cursors, statuses)
+    logging.info('Перечитано состояние подписок: %d', len(subscriptions))
+
+
+def notification_key(subscription, change):
+    """Ключ идемпотентности уведомления о переходе статуса."""
+    return ':'.join(map(str, (
+        token_hash(subscription.token), subscription.chat_id, change.key,
+        change.new_status, change.homework.get('date_updated', ''))))
+
+
+def notify_change(bot, subscription, change, store=None, outbox=None):
+    """Отправить сообщение о переходе статуса и запомнить его.
+
+    С `outbox` сообщение сначала надёжно записывается в журнал.
+    """
+    message = render_status(change.homework, subscription.chat_id)
+    if outbox is None:
+        send_to_chat(bot, subscription.chat_id, message)
+    else:
+        outbox.put(
+            notification_key(subscription, change),
+            subscription.chat_id, message)
+    subscription.statuses.set(
+        change.key, change.new_status,
+        change.homework.get('homework_name'),
+        change.homework.get('date_updated'))
+    subscription.last_status = change.new_status
+    subscription.last_message = message
+    if store is not None:
+        store.save_status(
+            subscription.state_key, change.key, change.new_status)
+
+
+def process_response(bot, subscription, response, store=None,
+                     outbox=None, history=None, router=None, counted=None):
+    """Разослать изменения из StatusesResponse и сдвинуть курсор.
+
+    С `router` переход дополнительно уходит получателям из правил.
+    `counted` - переходы этого ответа, уже учтённые в метрике для
+    других чатов токена. Возвращает True, если статус работы изменился.
+    """
+    homeworks = response.homeworks
+    changes = detect_changes(subscription.statuses, homeworks)
+    for change in changes:
+        if counted is None or (change.key, change.new_status) not in counted:
+            STATUS_CHANGES.inc()
+            if counted is not None:
+                counted.add((change.key, change.new_status))
+        notify_change(bot, subscription, change, store, outbox)
+        if history is not None:
+            history.record(
+                subscription.token, change.key,
+                change.homework.get('homework_name'),
+                change.old_status, change.new_status,
+                parse_date(change.homework.get('date_updated')))
+        if router is not None:
+            router.route(
+                subscription.token, subscription.chat_id, change,
+                subscription.last_message)
+    if not changes:
+        logging.debug('Статус не поменялся')
+    if homeworks:
+        subscription.from_date = response.current_date
+        if store is not None:
+            store.save_cursor(
+                subscription.state_key, subscription.from_date)
+    return bool(changes)
+
+
+def build_request(subscription, session=None, breaker=None, cache=None):
+    """Запрос статусов подписки; с `breaker` - через автомат отключения."""
+    request = functools.partial(
+        fetch_homeworks,
+        subscription.token, subscription.from_date, session, cache)
+    if breaker is None:
+        return request
+    return functools.partial(breaker.call, request)
+
+
+def fan_out(bot, subscription, request, registry=None, store=None,
+            outbox=None, history=None, router=None):
+    """Запросить статусы и разослать их всем чатам токена.
+
+    Ответ обрабатывается для подписки и для подписок других чатов на
+    тот же токен с тем же курсором, если они не на паузе. Возвращает
+    ответ, словарь `ключ подписки -> изменился ли статус` и множество
+    переходов, уже учтённых в метрике.
+    """
+    subscriptions = [subscription]
+    if registry is not None:
+        subscriptions += [
+            other for other in registry.for_token(subscription.token)
+            if other is not subscription and not other.paused
+            and other.from_date == subscription.from_date]
+    response = request()
+    if response is None:
+        return None, {}, set()
+    counted = set()
+    return response, {
+        other.key: process_response(
+            bot, other, response, store, outbox, history, router, counted)
+        for other in subscriptions}, counted
+
+
+def forget_response(cache, key):
+    """Убрать ответ из кеша, если он есть."""
+    if cache is not None:
+        cache.discard(key)
+
+
+def poll_subscription(bot, subscription, session=None, store=None,
+                      breaker=None, cache=None, outbox=None, history=None,
+                      registry=None, flights=None, router=None):
+    """Опросить API для одной подписки и отправить изменения.
+
+    С `registry` ответ получают все чаты токена с тем же курсором,
+    с `flights` одновременные запросы токена с одним from_date
+    объединяются в один HTTP-запрос.
+    Возвращает True, если статус работы изменился.
+    """
+    if subscription.paused:
+        return False
+    if subscription.next_poll_at:
+        POLL_LATENESS.observe(max(0, time.time() - subscription.next_poll_at))
+    flight = functools.partial(
+        fan_out, bot, subscription,
+        build_request(subscription, session, breaker, cache),
+        registry, store, outbox, history, router)
+    # Хеш тела запоминается до разбора ответа: если разбор или отправка
+    # упали, запись кеша убирается, чтобы следующий опрос с тем же
+    # телом повторил обработку, а не пропустил её как неизменившуюся.
+    cache_key = (subscription.token, subscription.from_date)
+    try:
+        if flights is None:
+            flights = SingleFlight()
+        response, changed, counted = flights.do(cache_key, flight)
+        if response is None:
+            logging.debug('Ответ API не изменился')
+            return False
+        if subscription.key not in changed:
+            return process_response(
+                bot, subscription, response, store, outbox, history, router,
+                counted)
+        return changed[subscription.key]
+    except exceptions.NotForSending as error:
+        forget_response(cache, cache_key)
+        logging.error('Сбой в работе программы: %s', error)
+    except Exception as error:
+        forget_response(cache, cache_key)
+        message = f'Сбой в работе программы: {error}'
+        logging.error(message)
+        if message != subscription.last_message:
+            send_to_chat(bot, subscription.chat_id, message)
+            subscription.last_message = message
+    return False
+
+
+def build_queue(registry):
+    """Поставить все подписки реестра в очередь опроса."""
+    queue = DueQueue()
+    registry.take_added()
+    for subscription in registry:
+        queue.push(subscription.key, subscription.next_poll_at)
+    return queue
+
+
+def poll_due(bot, registry, queue, policy, poll=poll_subscription,
+             stop=None):
+    """Опросить подписки, время опроса которых наступило.
+
+    При выставленном `stop` оставшиеся подписки не опрашиваются: после
+    перезапуска они попадут в очередь сразу. Возвращает время
+    следующего ближайшего опроса.
+    """
+    for key in registry.take_added():
+        queue.push(key, 0)
+    due = queue.pop_due(time.time())
+    POLL_QUEUE_DUE.set(len(due))
+    POLL_QUEUE_SIZE.set(len(queue))
+    for key in due:
+        if stop is not None and stop.is_set():
+            break
+        subscription = registry.get(key)
+        if subscription is None:
+            continue
+        changed = poll(bot, subscription)
+        queue.push(key, policy.reschedule(subscription, changed))
+    next_due = queue.next_due()
+    return time.time() + RETRY_TIME if next_due is None else next_due
+
+
+def build_policy():
+    """Создать политику адаптивного интервала опроса."""
+    return AdaptivePolicy(
+        min_interval=POLL_MIN_INTERVAL,
+        max_interval=POLL_MAX_INTERVAL,
+        default_interval=RETRY_TIME,
+        jitter=POLL_JITTER,
+    )
+
+
+def run_sync(bot, registry, poll, stop):
+    """Опрашивать подписки последовательно в одном потоке."""
+    policy = build_policy()
+    queue = build_queue(registry)
+    while not stop.is_set():
+        next_poll_at = poll_due(bot, registry, queue, policy, poll, stop)
+        stop.wait(min(
+            policy.min_interval, max(0, next_poll_at - time.time())))
+
+
+def run_async(bot, registry, poll, stop):
+    """Опрашивать подписки асинхронным движком."""
+    import asyncio
+
+    from async_engine import AsyncEngine
+
+    engine = AsyncEngine(poll, POLLING_CONCURRENCY)
+    try:
+        asyncio.run(engine.run_forever(
+            bot, registry, build_queue(registry), build_policy(), stop))
+    finally:
+        engine.close()
+
+
+def run_threads(bot, registry, poll, stop):
+    """Опрашивать подписки пулом потоков с лимитом на хост API."""
+    from urllib.parse import urlparse
+
+    from thread_engine import HostLimiter, ThreadEngine, parse_host_limits
+
+    host = urlparse(ENDPOINT).netloc
+    engine = ThreadEngine(
+        poll, POLLING_CONCURRENCY, POLLING_QUEUE_SIZE,
+        HostLimiter(parse_host_limits(POLLING_HOST_LIMITS),
+                    default_limit=PRACTICUM_POOL_SIZE),
+        host=lambda subscription: host)
+    engine.run_forever(
+        bot, registry, build_queue(registry), build_policy(), stop)
+
+
+def poll_owned(member, poll, bot, subscription):
+    """Опросить подписку, только если её токен арендован воркером."""
+    if not member.owns(subscription.token):
+        subscription.idle_polls = 0
+        return False
+    return poll(bot, subscription)
+
+
+def shard_workers():
+    """Число процессов-воркеров: 0 - без шардирования, auto - по ядрам."""
+    if SHARD_WORKERS == 'auto':
+        return os.cpu_count() or 1
+    return int(SHARD_WORKERS)
+
+
+STOP = threading.Event()
+
+
+def handle_stop_signal(signum, frame):
+    """Начать плавную остановку по SIGTERM или SIGINT."""
+    logging.info('Получен сигнал %s, завершаем работу', signum)
+    STOP.set()
+
+
+def install_stop_handlers():
+    """Перехватить сигналы остановки, если это главный поток."""
+    if threading.current_thread() is not threading.main_thread():
+        return
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, handle_stop_signal)
+
+
+def start_templates():
+    """Загрузить шаблоны сообщений и перечитывать их без перезапуска.
+
+    Файл проверяется по времени изменения, SIGHUP перечитывает сразу.
+    """
+    if not TEMPLATES_FILE:
+        return
+    MESSAGE_TEMPLATES.load(TEMPLATES_FILE)
+    MESSAGE_TEMPLATES.start(TEMPLATES_CHECK_INTERVAL)
+    if (hasattr(signal, 'SIGHUP')
+            and threading.current_thread() is threading.main_thread()):
+        signal.signal(
+            signal.SIGHUP, lambda *args: MESSAGE_TEMPLATES.request_reload())
+
+
+def run_bot(worker_id=None):
+    """Опрашивать подписки; с `worker_id` - только токены своего шарда."""
+    import telegram
+
+    bot = DeliveryQueue(
+        telegram.Bot(token=TELEGRAM_TOKEN),
+        TELEGRAM_CHAT_RATE, TELEGRAM_GLOBAL_RATE,
+        workers=TELEGRAM_WORKERS)
+    store = open_state_store(STATE_BACKEND, STATE_PATH, STATE_FLUSH_INTERVAL)
+    registry = build_registry(int(time.time()), store)
+    logging.info('Загружено подписок: %d', len(registry))
+    session = PracticumSession(PRACTICUM_POOL_SIZE)
+    breaker = CircuitBreaker(
+        failure_ratio=BREAKER_FAILURE_RATIO,
+        min_calls=BREAKER_MIN_CALLS,
+        max_delay=BREAKER_MAX_DELAY)
+    cache = ResponseCache(RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL)
+    member = None
+    if worker_id is not None:
+        member = ShardMember(
+            SHARD_LEASE_PATH, worker_id, SHARD_LEASE_TTL,
+            on_acquire=functools.partial(reload_owned, registry, store),
+            on_release=lambda hashes: store.flush())
+    outbox = open_outbox(
+        OUTBOX_BACKEND, worker_path(OUTBOX_PATH, worker_id), bot,
+        commit_interval=OUTBOX_COMMIT_INTERVAL,
+        redeliver_after=OUTBOX_REDELIVER_AFTER,
+        max_attempts=OUTBOX_MAX_ATTEMPTS,
+        claims=member)
+    router = open_router(bot)
+    history = None
+    if HISTORY_PATH:
+        history = StatusHistory(worker_path(HISTORY_PATH, worker_id))
+    poll = functools.partial(
+        poll_subscription, session=session, store=store,
+        breaker=breaker, cache=cache, outbox=outbox, history=history,
+        registry=registry, flights=SingleFlight(SINGLEFLIGHT_LINGER),
+        router=router)
+    if member is not None:
+        member.start(registry.tokens)
+        poll = functools.partial(poll_owned, member, poll)
+    start_templates()
+    updater = None
+    if COMMANDS_MODE != 'off' and worker_id is None:
+        updater = start_commands(
+            TELEGRAM_TOKEN,
+            CommandService(registry, SUBSCRIPTIONS_FILE, history=history),
+            WEBHOOK_URL if COMMANDS_MODE == 'webhook' else None,
+            WEBHOOK_LISTEN, WEBHOOK_PORT)
+    if METRICS_PORT:
+        metrics.start_server(METRICS_PORT + (worker_id or 0))
+    store.start()
+    bot.start()
+    router.start()
+    outbox.start()
+    if history is not None:
+        history.start()
+    install_stop_handlers()
+    try:
+        if POLLING_ENGINE == 'async':
+            run_async(bot, registry, poll, STOP)
+        elif POLLING_ENGINE == 'threads':
+            run_threads(bot, registry, poll, STOP)
+        else:
+            run_sync(bot, registry, poll, STOP)
+    finally:
+        STOP.set()
+        logging.info('Пул соединений: %s', session.stats())
+        if updater is not None:
+            updater.stop()
+        if member is not None:
+            member.close()
+        session.close()
+        deadline = time.monotonic() + SHUTDOWN_TIMEOUT
+        router.close(SHUTDOWN_TIMEOUT / 2)
+        bot.close(max(0, deadline - time.monotonic()))
+        outbox.close()
+        store.close()
+        if history is not None:
+            history.close()
+        logging.info('Работа завершена, курсоры сохранены')
+        MESSAGE_TEMPLATES.close()
+
+
+def open_router(bot):
+    """Маршрутизатор уведомлений из ROUTES_FILE; без файла - пустой."""
+    if not ROUTES_FILE:
+        return Router({}, [])
+    router = load_routes(
+        ROUTES_FILE, bot, HOMEWORK_STATUSES, ROUTES_QUEUE_SIZE)
+    logging.info('Получателей уведомлений: %d', len(router.sinks))
+    return router
+
+
+def worker_path(path, worker_id):
+    """Путь к файлу воркера шарда: `log.txt` -> `log-1.txt`."""
+    if worker_id is None:
+        return path
+    root, extension = os.path.splitext(path)
+    return f'{root}-{worker_id}{extension}'
+
+
+def run_worker(worker_id):
+    """Точка входа процесса-воркера шарда."""
+    setup_logging(
+        LOG_FORMAT, worker_path(LOG_FILE, worker_id), LOG_LEVEL,
+        max_bytes=LOG_MAX_BYTES, backup_count=LOG_BACKUP_COUNT)
+    run_bot(worker_id)
+
+
 def main():
     """Основная логика работы бота."""
-    if not check_tokens():
+    if not (check_tokens() or (TELEGRAM_TOKEN and SUBSCRIPTIONS_FILE)):
         logging.critical('Отсутствует необходимое кол-во'
                          ' переменных окружения')
         sys.exit('Отсутсвуют переменные окружения')
-    bot = telegram.Bot(token=TELEGRAM_TOKEN)
-    current_timestamp = int(time.time())
-    current_report = {
-        'name': '',
-        'output': ''
-    }
-    prev_report = current_report.copy()
-    while True:
-        try:
-            response = get_api_answer(current_timestamp)
-            current_timestamp = response.get(
-                'current_data', current_timestamp)
-            new_homeworks = check_response(response)
-            if new_homeworks:
-                homework = new_homeworks[0]
-                current_report['name'] = homework.get('homework_name')
-                current_report['output'] = homework.get('status')
-            else:
-                current_report['output'] = 'Нет новых статусов работ.'
-            if current_report != prev_report:
-                send = f' {current_report["name"]}, {current_report["output"]}'
-                send_message(bot, send)
-                prev_report = current_report.copy()
-            else:
-                logging.debug('Статус не поменялся')
-        except exceptions.NotForSending as error:
-            message = f'Сбой в работе программы: {error}'
-            logging.error(message)
-        except Exception as error:
-            message = f'Сбой в работе программы: {error}'
-            current_report['output'] = message
-            logging.error(message)
-            if current_report != prev_report:
-                send_message(bot, message)
-                prev_report = current_report.copy
-        finally:
-            time.sleep(RETRY_TIME)
+    errors = validate_tokens(TELEGRAM_TOKEN, TELEGRAM_CHAT_ID)
+    if errors:
+        for error in errors:
+            logging.critical(error)
+        sys.exit('Неверный формат переменных окружения')
+    workers = shard_workers()
+    if workers and STATE_BACKEND != 'sqlite':
+        logging.critical(
+            'Шардирование требует STATE_BACKEND=sqlite: журнал %s нельзя '
+            'дописывать из нескольких процессов', STATE_BACKEND)
+        sys.exit('Неподдерживаемое хранилище состояния для шардирования')
+    if workers:
+        if COMMANDS_MODE != 'off':
+            logging.warning(
+                'Команды чата не работают с шардированием: у воркеров '
+                'нет общего реестра подписок')
+        install_stop_handlers()
+        run_supervisor(workers, run_worker, stop=STOP,
+                       shutdown_timeout=SHUTDOWN_TIMEOUT + 5)
+    else:
+        run_bot()
 
 
 if __name__ == '__main__':
-    logging.basicConfig(
-        level=logging.INFO,
-        format=(
-            '%(asctime)s, %(levelname)s, Путь - %(pathname)s, '
-            'Файл - %(filename)s, Функция - %(funcName)s, '
-            'Номер строки - %(lineno)d, %(message)s'
-        ),
-        handlers=[logging.FileHandler('log.txt', encoding='UTF-8'),
-                  logging.StreamHandler(sys.stdout)])
+    setup_logging(
+        LOG_FORMAT, LOG_FILE, LOG_LEVEL,
+        max_bytes=LOG_MAX_BYTES, backup_count=LOG_BACKUP_COUNT)
     main()
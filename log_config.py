@@ -0,0 +1,86 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import time
+
+TEXT_FORMAT = (
+    '%(asctime)s, %(levelname)s, Путь - %(pathname)s, '
+    'Файл - %(filename)s, Функция - %(funcName)s, '
+    'Номер строки - %(lineno)d, %(message)s'
+)
+
+
+class JsonFormatter(logging.Formatter):
+    """Запись лога одной JSON-строкой."""
+
+    def format(self, record):
+        """Собрать JSON из полей записи."""
+        data = {
+            'time': time.strftime(
+                '%Y-%m-%dT%H:%M:%S', time.localtime(record.created)),
+            'level': record.levelname,
+            'module': record.module,
+            'function': record.funcName,
+            'line': record.lineno,
+            'thread': record.threadName,
+            'message': record.getMessage(),
+        }
+        if record.exc_info:
+            data['exception'] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False)
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """Кладёт запись в очередь без форматирования.
+
+    Сообщение собирается в потоке QueueListener, а при переполнении
+    очереди запись отбрасывается, чтобы не блокировать опрос.
+    """
+
+    dropped = 0
+
+    def prepare(self, record):
+        """Вернуть запись как есть, форматирует слушатель."""
+        return record
+
+    def enqueue(self, record):
+        """Положить запись в очередь или отбросить её."""
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DeferredQueueHandler.dropped += 1
+
+
+def setup_logging(log_format='text', path='log.txt', level=logging.INFO,
+                  max_bytes=10 * 1024 * 1024, backup_count=5,
+                  queue_size=10000):
+    """Настроить логирование через фоновый поток записи.
+
+    Файл ротируется по размеру. Возвращает запущенный QueueListener.
+    """
+    formatter = (JsonFormatter() if log_format == 'json'
+                 else logging.Formatter(TEXT_FORMAT))
+    file_handler = logging.handlers.RotatingFileHandler(
+        path, maxBytes=max_bytes, backupCount=backup_count,
+        encoding='UTF-8')
+    stream_handler = logging.StreamHandler(sys.stdout)
+    for handler in (file_handler, stream_handler):
+        handler.setFormatter(formatter)
+    records = queue.Queue(maxsize=queue_size)
+    listener = logging.handlers.QueueListener(
+        records, file_handler, stream_handler, respect_handler_level=True)
+    root = logging.getLogger()
+    root.handlers[:] = [DeferredQueueHandler(records)]
+    root.setLevel(level)
+    listener.start()
+    atexit.register(stop_listener, listener)
+    return listener
+
+
+def stop_listener(listener):
+    """Дописать очередь и остановить поток записи, если он работает."""
+    if listener._thread is not None:
+        listener.stop()
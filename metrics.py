@@ -0,0 +1,213 @@
+import bisect
+import functools
+import threading
+import time
+
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300,
+)
+
+
+def format_labels(labels):
+    """Метки в формате Prometheus: {a="1",b="2"}."""
+    if not labels:
+        return ''
+    pairs = ','.join(f'{key}="{value}"' for key, value in labels)
+    return '{' + pairs + '}'
+
+
+class Counter:
+    """Счётчик, который только растёт."""
+
+    __slots__ = ('value', '_lock')
+    kind = 'counter'
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        """Увеличить счётчик."""
+        with self._lock:
+            self.value += amount
+
+    def sample(self):
+        """Текущее значение."""
+        return self.value
+
+    def render(self, name, labels):
+        """Строки в текстовом формате Prometheus."""
+        return [f'{name}{format_labels(labels)} {self.value}']
+
+
+class Gauge(Counter):
+    """Значение, которое может расти и уменьшаться."""
+
+    __slots__ = ()
+    kind = 'gauge'
+
+    def set(self, value):
+        """Установить значение."""
+        self.value = value
+
+
+class Histogram:
+    """Распределение значений по корзинам."""
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count', '_lock')
+    kind = 'histogram'
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        """Учесть значение."""
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def sample(self):
+        """Число наблюдений, сумма и накопленные корзины."""
+        with self._lock:
+            counts, total, count = list(self.counts), self.sum, self.count
+        cumulative, buckets = 0, {}
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            buckets[bound] = cumulative
+        return {'count': count, 'sum': total, 'buckets': buckets}
+
+    def render(self, name, labels):
+        """Строки в текстовом формате Prometheus."""
+        sample = self.sample()
+        lines = [
+            f'{name}_bucket{format_labels(labels + (("le", bound),))} {value}'
+            for bound, value in sample['buckets'].items()
+        ]
+        inf_labels = format_labels(labels + (('le', '+Inf'),))
+        lines.append(f'{name}_bucket{inf_labels} {sample["count"]}')
+        lines.append(f'{name}_sum{format_labels(labels)} {sample["sum"]}')
+        lines.append(f'{name}_count{format_labels(labels)} {sample["count"]}')
+        return lines
+
+
+class Registry:
+    """Набор метрик процесса."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._help = {}
+        self._lock = threading.Lock()
+
+    def _get(self, metric_class, name, help_text, labels):
+        key = (name, tuple(sorted(labels.items())))
+        metric = self._metrics.get(key)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(key)
+                if metric is None:
+                    metric = self._metrics[key] = metric_class()
+                    self._help.setdefault(name, (metric.kind, help_text))
+        return metric
+
+    def counter(self, name, help_text='', **labels):
+        """Счётчик с указанными метками."""
+        return self._get(Counter, name, help_text, labels)
+
+    def gauge(self, name, help_text='', **labels):
+        """Показатель с указанными метками."""
+        return self._get(Gauge, name, help_text, labels)
+
+    def histogram(self, name, help_text='', **labels):
+        """Гистограмма с указанными метками."""
+        return self._get(Histogram, name, help_text, labels)
+
+    def snapshot(self):
+        """Значения всех метрик: имя{метки} -> значение."""
+        return {
+            name + format_labels(labels): metric.sample()
+            for (name, labels), metric in list(self._metrics.items())
+        }
+
+    def render(self):
+        """Все метрики в текстовом формате Prometheus."""
+        lines = []
+        for name, (kind, help_text) in sorted(self._help.items()):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            for (metric_name, labels), metric in list(self._metrics.items()):
+                if metric_name == name:
+                    lines.extend(metric.render(name, labels))
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+def timed(function_name, registry=REGISTRY):
+    """Декоратор: число вызовов, ошибки и длительность функции."""
+    duration = registry.histogram(
+        'bot_call_duration_seconds', 'Длительность вызова функции',
+        function=function_name)
+    calls = registry.counter(
+        'bot_calls_total', 'Вызовы функции', function=function_name)
+    errors = registry.counter(
+        'bot_call_errors_total', 'Вызовы, завершившиеся ошибкой',
+        function=function_name)
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                errors.inc()
+                raise
+            finally:
+                calls.inc()
+                duration.observe(time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+def metrics_handler(registry=REGISTRY):
+    """Класс обработчика, отдающего метрики по адресу /metrics.
+
+    http.server импортируется только при включённых метриках.
+    """
+    from http.server import BaseHTTPRequestHandler
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            if self.path != '/metrics':
+                self.send_error(404)
+                return
+            body = registry.render().encode('UTF-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return MetricsHandler
+
+
+def start_server(port, host='127.0.0.1', registry=REGISTRY):
+    """Запустить HTTP-сервер /metrics в фоновом потоке."""
+    from http.server import ThreadingHTTPServer
+
+    server = ThreadingHTTPServer((host, port), metrics_handler(registry))
+    thread = threading.Thread(
+        target=server.serve_forever, name='metrics', daemon=True)
+    thread.start()
+    return server
@@ -0,0 +1,389 @@
+import abc
+import functools
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+
+class OutboxEntry:
+    """Уведомление в журнале: ключ идемпотентности, чат и текст."""
+
+    __slots__ = ('key', 'chat_id', 'text', 'created')
+
+    def __init__(self, key, chat_id, text, created=None):
+        self.key = key
+        self.chat_id = str(chat_id)
+        self.text = text
+        self.created = time.time() if created is None else created
+
+    def __repr__(self):
+        return f'OutboxEntry({self.key!r}, chat_id={self.chat_id!r})'
+
+
+class Outbox(abc.ABC):
+    """Надёжный журнал исходящих уведомлений.
+
+    Уведомление сначала записывается в журнал, и только потом уходит
+    в очередь отправки `sink`; после отправки запись подтверждается.
+    Записи и подтверждения копятся в памяти и фиксируются пачкой
+    (групповой коммит), `put` ждёт фиксации своей пачки. Повторный
+    ключ идемпотентности игнорируется, неподтверждённые записи
+    отправляются заново после перезапуска или через `redeliver_after`.
+    После `max_attempts` отказов подряд запись помечается отброшенной
+    и больше не отправляется. Подтверждённые и отброшенные записи
+    удаляются через `retention` секунд.
+    Необязательный `claims` (см. `ShardMember.claim`) отмечает ключ в
+    общей для воркеров таблице: если `claim` вернул False, уведомление
+    уже отправил другой воркер. После записи в журнал отметка
+    подтверждается, при сбое записи - снимается.
+    """
+
+    def __init__(self, sink, commit_interval=0.01, redeliver_after=60,
+                 retention=7 * 24 * 3600, claims=None, max_attempts=5):
+        self.sink = sink
+        self.claims = claims
+        self.commit_interval = commit_interval
+        self.redeliver_after = redeliver_after
+        self.retention = retention
+        self.max_attempts = max_attempts
+        self._condition = threading.Condition()
+        self._batch = {}
+        self._acks = []
+        self._dead = []
+        self._attempts = {}
+        self._inflight = set()
+        self._generation = 0
+        self._committed = 0
+        self._failed = 0
+        self._error = None
+        self._stop = False
+        self._thread = None
+        self.commits = 0
+
+    def put(self, key, chat_id, text):
+        """Записать уведомление и поставить его в отправку.
+
+        Возвращает управление после фиксации пачки с этой записью;
+        если пачку записать не удалось, выбрасывает RuntimeError.
+        """
+        if self.claims is None:
+            self._put(key, chat_id, text)
+            return
+        if not self.claims.claim(key):
+            logging.info('Уведомление %s уже отправлено другим воркером', key)
+            return
+        try:
+            self._put(key, chat_id, text)
+        except Exception:
+            self.claims.release(key)
+            raise
+        self.claims.confirm(key)
+
+    def _put(self, key, chat_id, text):
+        with self._condition:
+            if key in self._inflight:
+                return
+            if key not in self._batch:
+                self._batch[key] = OutboxEntry(key, chat_id, text)
+                self._condition.notify_all()
+            generation = self._generation
+            if self._thread is not None:
+                self._wait_commit(generation)
+                return
+        self._commit()
+
+    def _wait_commit(self, generation):
+        """Дождаться фиксации пачки, собранной после `generation`."""
+        while self._committed <= generation and not self._stop:
+            if self._failed > generation:
+                raise RuntimeError(
+                    f'Журнал уведомлений не записан: {self._error}')
+            self._condition.wait()
+
+    def _commit(self):
+        """Зафиксировать накопленную пачку записей и подтверждений.
+
+        Вызывается из одного потока: фонового или, без него, из `put`.
+        """
+        with self._condition:
+            batch, self._batch = list(self._batch.values()), {}
+            acks, self._acks = self._acks, []
+            dead, self._dead = self._dead, []
+            self._generation += 1
+            generation = self._generation
+        changed = bool(batch or acks or dead)
+        try:
+            new = self._write(batch, acks, dead) if changed else []
+        except Exception as error:
+            with self._condition:
+                restored = {entry.key: entry for entry in batch}
+                restored.update(self._batch)
+                self._batch = restored
+                self._acks = acks + self._acks
+                self._dead = dead + self._dead
+                self._failed = generation
+                self._error = error
+                self._condition.notify_all()
+            raise
+        with self._condition:
+            self.commits += changed
+            self._committed = generation
+            self._condition.notify_all()
+            self._dispatch(new)
+
+    def _dispatch(self, entries):
+        for entry in entries:
+            self._inflight.add(entry.key)
+            try:
+                self.sink.send_message(
+                    chat_id=entry.chat_id, text=entry.text,
+                    on_done=functools.partial(self._done, entry.key))
+            except RuntimeError as error:
+                self._inflight.discard(entry.key)
+                logging.warning('Уведомление осталось в журнале: %s', error)
+
+    def _done(self, key, sent):
+        with self._condition:
+            self._inflight.discard(key)
+            if sent:
+                self._attempts.pop(key, None)
+                self._acks.append(key)
+                self._condition.notify_all()
+                return
+            attempts = self._attempts.get(key, 0) + 1
+            if attempts < self.max_attempts:
+                self._attempts[key] = attempts
+                return
+            del self._attempts[key]
+            logging.error('Уведомление %s отброшено после %d попыток',
+                          key, attempts)
+            self._dead.append(key)
+            self._condition.notify_all()
+
+    def recover(self):
+        """Поставить в отправку все неподтверждённые записи."""
+        self._redeliver(time.time())
+
+    def _redeliver(self, before):
+        pending = self._pending(before)
+        with self._condition:
+            skip = self._inflight.union(self._acks, self._dead)
+            entries = [entry for entry in pending if entry.key not in skip]
+            if entries:
+                logging.info('Повторная отправка уведомлений: %d',
+                             len(entries))
+            self._dispatch(entries)
+
+    def start(self):
+        """Запустить фоновую фиксацию и повторную отправку."""
+        self.recover()
+        self._thread = threading.Thread(
+            target=self._run, name='outbox', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        last_scan = time.monotonic()
+        while True:
+            with self._condition:
+                while not (self._batch or self._acks or self._dead
+                           or self._stop):
+                    if not self._condition.wait(self.redeliver_after):
+                        break
+                if self._stop:
+                    return
+            time.sleep(self.commit_interval)
+            try:
+                self._commit()
+                if time.monotonic() - last_scan >= self.redeliver_after:
+                    last_scan = time.monotonic()
+                    self._redeliver(time.time() - self.redeliver_after)
+                    self._prune(time.time() - self.retention)
+            except Exception as error:
+                logging.error('Не удалось записать журнал уведомлений: %s',
+                              error)
+
+    def close(self):
+        """Остановить фоновый поток и зафиксировать остаток."""
+        with self._condition:
+            self._stop = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+        self._commit()
+        self._close()
+
+    @abc.abstractmethod
+    def _write(self, entries, acks, dead):
+        """Записать новые записи, подтверждения и отброшенные ключи.
+
+        Возвращает новые записи.
+        """
+
+    @abc.abstractmethod
+    def _pending(self, before):
+        """Неподтверждённые записи, созданные раньше `before`."""
+
+    def _prune(self, before):
+        """Удалить подтверждённые и отброшенные записи старше `before`."""
+
+    def _close(self):
+        """Закрыть хранилище журнала."""
+
+
+class SQLiteOutbox(Outbox):
+    """Журнал уведомлений в базе SQLite в режиме WAL.
+
+    Столбец acked: 0 - ждёт отправки, 1 - отправлено, 2 - отброшено.
+    """
+
+    def __init__(self, path, sink, **kwargs):
+        super().__init__(sink, **kwargs)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=FULL')
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS outbox ('
+            'key TEXT PRIMARY KEY, chat_id TEXT NOT NULL, '
+            'text TEXT NOT NULL, created REAL NOT NULL, '
+            'acked INTEGER NOT NULL DEFAULT 0)')
+        self._connection.commit()
+
+    def _write(self, entries, acks, dead):
+        new = []
+        with self._connection:
+            for entry in entries:
+                cursor = self._connection.execute(
+                    'INSERT OR IGNORE INTO outbox '
+                    '(key, chat_id, text, created) VALUES (?, ?, ?, ?)',
+                    (entry.key, entry.chat_id, entry.text,
+                     entry.created))
+                if cursor.rowcount:
+                    new.append(entry)
+            self._connection.executemany(
+                'UPDATE outbox SET acked = 1 WHERE key = ?',
+                ((key,) for key in acks))
+            self._connection.executemany(
+                'UPDATE outbox SET acked = 2 WHERE key = ?',
+                ((key,) for key in dead))
+        return new
+
+    def _pending(self, before):
+        return [
+            OutboxEntry(*row) for row in self._connection.execute(
+                'SELECT key, chat_id, text, created FROM outbox '
+                'WHERE acked = 0 AND created <= ? ORDER BY created',
+                (before,))
+        ]
+
+    def _prune(self, before):
+        with self._connection:
+            self._connection.execute(
+                'DELETE FROM outbox WHERE acked != 0 AND created < ?',
+                (before,))
+
+    def _close(self):
+        self._connection.close()
+
+
+class AppendOnlyOutbox(Outbox):
+    """Журнал уведомлений в файле JSON-строк, который только дописывается.
+
+    Записи {"e": [...]} добавляют уведомление, {"a": ключ} подтверждают
+    его, {"d": ключ} отбрасывают. Ключи держатся в памяти. Журнал
+    сжимается при открытии, если в нём больше строк, чем вдвое от живых,
+    и после удаления записей старше `retention`.
+    """
+
+    def __init__(self, path, sink, **kwargs):
+        super().__init__(sink, **kwargs)
+        self.path = path
+        self._entries = {}
+        self._acked = {}
+        if os.path.exists(path):
+            self._load()
+
+    def _load(self):
+        records = 0
+        with open(self.path, encoding='UTF-8') as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    logging.warning('Пропущена повреждённая запись')
+                    continue
+                records += 1
+                if 'e' in record:
+                    entry = OutboxEntry(*record['e'])
+                    self._entries[entry.key] = entry
+                    continue
+                entry = self._entries.pop(
+                    record.get('a', record.get('d')), None)
+                if entry is not None:
+                    self._acked[entry.key] = entry.created
+        before = time.time() - self.retention
+        self._acked = {key: created for key, created in self._acked.items()
+                       if created >= before}
+        if records > 2 * (len(self._entries) + 2 * len(self._acked)):
+            self._compact()
+
+    def _compact(self):
+        temp_path = f'{self.path}.tmp'
+        with open(temp_path, 'w', encoding='UTF-8') as file:
+            for key, created in self._acked.items():
+                file.write(json.dumps({'e': [key, '', '', created]}) + '\n')
+                file.write(json.dumps({'a': key}) + '\n')
+            for entry in self._entries.values():
+                file.write(self._dump(entry) + '\n')
+        os.replace(temp_path, self.path)
+
+    @staticmethod
+    def _dump(entry):
+        return json.dumps({'e': [
+            entry.key, entry.chat_id, entry.text, entry.created]})
+
+    def _write(self, entries, acks, dead):
+        new = [entry for entry in entries
+               if entry.key not in self._entries
+               and entry.key not in self._acked]
+        lines = [self._dump(entry) for entry in new]
+        lines.extend(json.dumps({'a': key}) for key in acks)
+        lines.extend(json.dumps({'d': key}) for key in dead)
+        with open(self.path, 'a', encoding='UTF-8') as file:
+            file.write('\n'.join(lines) + '\n')
+            file.flush()
+            os.fsync(file.fileno())
+        for entry in new:
+            self._entries[entry.key] = entry
+        for key in acks + dead:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._acked[key] = entry.created
+        return new
+
+    def _pending(self, before):
+        return sorted(
+            (entry for entry in self._entries.values()
+             if entry.created <= before),
+            key=lambda entry: entry.created)
+
+    def _prune(self, before):
+        expired = [key for key, created in self._acked.items()
+                   if created < before]
+        for key in expired:
+            del self._acked[key]
+        if expired:
+            self._compact()
+
+
+def open_outbox(backend, path, sink, **kwargs):
+    """Создать журнал уведомлений по имени бэкенда."""
+    backends = {
+        'sqlite': SQLiteOutbox,
+        'aof': AppendOnlyOutbox,
+    }
+    if backend not in backends:
+        raise ValueError(f'Неизвестный журнал уведомлений - {backend}')
+    return backends[backend](path, sink, **kwargs)
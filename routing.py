@@ -0,0 +1,289 @@
+import abc
+import json
+import logging
+import queue
+import threading
+import time
+from collections import OrderedDict
+
+import metrics
+from sharding import token_hash
+
+
+class Sink(abc.ABC):
+    """Получатель уведомлений со своей очередью и потоком отправки.
+
+    Медленный получатель не задерживает остальных: события ждут
+    только в его очереди, а при её переполнении новые события
+    отбрасываются с записью в лог.
+    """
+
+    def __init__(self, name, queue_size=1000):
+        self.name = name
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self.sent = metrics.REGISTRY.counter(
+            'bot_route_sent_total', 'Уведомления, доставленные получателям',
+            sink=name)
+        self.failed = metrics.REGISTRY.counter(
+            'bot_route_failed_total', 'Ошибки доставки получателям',
+            sink=name)
+        self.dropped = metrics.REGISTRY.counter(
+            'bot_route_dropped_total',
+            'Уведомления, отброшенные из-за переполненной очереди',
+            sink=name)
+
+    def submit(self, event):
+        """Поставить событие в очередь, не дожидаясь отправки."""
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.dropped.inc()
+            logging.warning(
+                'Очередь получателя %s переполнена, уведомление отброшено',
+                self.name)
+            return False
+        return True
+
+    @abc.abstractmethod
+    def deliver(self, event):
+        """Отправить одно событие; реализуют наследники."""
+
+    def start(self):
+        """Запустить поток отправки."""
+        self._thread = threading.Thread(
+            target=self._run, name=f'sink-{self.name}', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            event = self._queue.get()
+            if event is None:
+                return
+            try:
+                self.deliver(event)
+            except Exception as error:
+                self.failed.inc()
+                logging.error(
+                    'Не удалось отправить уведомление получателю %s: %s',
+                    self.name, error)
+            else:
+                self.sent.inc()
+
+    def close(self, timeout=None):
+        """Дослать очередь и остановить поток не дольше `timeout`."""
+        if self._thread is None:
+            return
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            logging.warning('Получатель %s не успел дослать очередь',
+                            self.name)
+            return
+        self._thread.join(timeout)
+        self._thread = None
+
+
+class TelegramSink(Sink):
+    """Уведомления в чат Telegram через бота или очередь отправки."""
+
+    def __init__(self, name, bot, chat_id, **kwargs):
+        super().__init__(name, **kwargs)
+        self.bot = bot
+        self.chat_id = chat_id
+
+    def deliver(self, event):
+        """Отправить текст уведомления в чат."""
+        self.bot.send_message(chat_id=self.chat_id, text=event['message'])
+
+
+class WebhookSink(Sink):
+    """POST события в формате JSON на адрес вебхука."""
+
+    def __init__(self, name, url, timeout=5, headers=None, **kwargs):
+        super().__init__(name, **kwargs)
+        self.url = url
+        self.timeout = timeout
+        self.headers = headers or {}
+
+    def deliver(self, event):
+        """Отправить событие; ответ не 2xx считается ошибкой."""
+        import requests
+
+        response = requests.post(
+            self.url, json=event, headers=self.headers, timeout=self.timeout)
+        response.raise_for_status()
+
+
+class SmtpSink(Sink):
+    """Письмо о переходе статуса через SMTP-сервер."""
+
+    def __init__(self, name, recipients, host='localhost', port=25,
+                 sender='homework-bot@localhost', timeout=10, **kwargs):
+        super().__init__(name, **kwargs)
+        self.recipients = recipients
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.timeout = timeout
+
+    def deliver(self, event):
+        """Отправить письмо всем адресатам."""
+        import smtplib
+        from email.message import EmailMessage
+
+        message = EmailMessage()
+        message['From'] = self.sender
+        message['To'] = ', '.join(self.recipients)
+        message['Subject'] = f'{event["homework"]}: {event["status"]}'
+        message.set_content(event['message'])
+        with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as smtp:
+            smtp.send_message(message)
+
+
+class FileSink(Sink):
+    """Запись событий в файл, по одному JSON на строку."""
+
+    def __init__(self, name, path, **kwargs):
+        super().__init__(name, **kwargs)
+        self.path = path
+
+    def deliver(self, event):
+        """Дописать событие в конец файла."""
+        with open(self.path, 'a', encoding='UTF-8') as file:
+            file.write(json.dumps(event, ensure_ascii=False) + '\n')
+
+
+SINK_TYPES = {
+    'telegram': TelegramSink,
+    'webhook': WebhookSink,
+    'smtp': SmtpSink,
+    'file': FileSink,
+}
+
+
+def build_sink(name, config, bot=None, queue_size=1000):
+    """Создать получателя по описанию `{"type": ..., параметры}`."""
+    options = dict(config)
+    sink_type = options.pop('type', None)
+    if sink_type not in SINK_TYPES:
+        raise ValueError(f'Неизвестный тип получателя {name}: {sink_type}')
+    if sink_type == 'telegram':
+        options['bot'] = bot
+    return SINK_TYPES[sink_type](name, queue_size=queue_size, **options)
+
+
+def compile_rules(rules, sinks, statuses=()):
+    """Индекс (токен, статус) -> кортеж получателей.
+
+    Правило без `tokens` или `statuses` подходит к любому токену или
+    статусу. Для каждого токена из правил и каждого статуса индекс
+    заранее объединяет все подходящие правила, ключ `None` вместо
+    токена - правила для любых токенов.
+    """
+    matched = {}
+    tokens = {None}
+    statuses = set(statuses) | {None}
+    for rule in rules:
+        names = rule['sinks']
+        unknown = [name for name in names if name not in sinks]
+        if unknown:
+            raise ValueError(f'Неизвестные получатели: {", ".join(unknown)}')
+        for token in rule.get('tokens') or [None]:
+            tokens.add(token)
+            for status in rule.get('statuses') or [None]:
+                statuses.add(status)
+                matched.setdefault((token, status), []).extend(names)
+    index = {}
+    for token in tokens:
+        for status in statuses:
+            names = (matched.get((token, status), [])
+                     + matched.get((token, None), [])
+                     + matched.get((None, status), [])
+                     + matched.get((None, None), []))
+            index[token, status] = tuple(
+                sinks[name] for name in dict.fromkeys(names))
+    return index
+
+
+class Router:
+    """Рассылка переходов статусов по получателям из правил.
+
+    Правила компилируются при создании, поэтому подбор получателей
+    для события - не больше трёх обращений к словарю. Переход,
+    уже разосланный для другого чата того же токена, повторно
+    не рассылается.
+    """
+
+    def __init__(self, sinks, rules, statuses=(), dedupe_size=10000):
+        self.sinks = sinks
+        self.dedupe_size = dedupe_size
+        self._index = compile_rules(rules, sinks, statuses)
+        self._seen = OrderedDict()
+        self._lock = threading.Lock()
+
+    def match(self, token, status):
+        """Получатели перехода токена в статус `status`."""
+        sinks = self._index.get((token, status))
+        if sinks is None:
+            sinks = self._index.get((None, status))
+        if sinks is None:
+            sinks = self._index.get((token, None), self._index[None, None])
+        return sinks
+
+    def _first_time(self, key):
+        with self._lock:
+            if key in self._seen:
+                return False
+            self._seen[key] = True
+            if len(self._seen) > self.dedupe_size:
+                self._seen.popitem(last=False)
+            return True
+
+    def route(self, token, chat_id, change, message):
+        """Разослать переход статуса; возвращает число получателей."""
+        sinks = self.match(token, change.new_status)
+        homework = change.homework
+        if not sinks or not self._first_time((
+                token, change.key, change.new_status,
+                homework.get('date_updated'))):
+            return 0
+        event = {
+            'token': token_hash(token),
+            'chat_id': chat_id,
+            'key': str(change.key),
+            'homework': homework.get('homework_name'),
+            'old_status': change.old_status,
+            'status': change.new_status,
+            'date_updated': homework.get('date_updated'),
+            'at': int(time.time()),
+            'message': message,
+        }
+        return sum(sink.submit(event) for sink in sinks)
+
+    def start(self):
+        """Запустить потоки всех получателей."""
+        for sink in self.sinks.values():
+            sink.start()
+
+    def close(self, timeout=None):
+        """Дослать очереди получателей за общее время `timeout`."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for sink in self.sinks.values():
+            sink.close(None if deadline is None
+                       else max(0, deadline - time.monotonic()))
+
+
+def load_routes(path, bot=None, statuses=(), queue_size=1000):
+    """Загрузить получателей и правила маршрутизации из JSON-файла.
+
+    Формат: `{"sinks": {имя: {"type": ..., ...}}, "routes": [{"tokens":
+    [...], "statuses": [...], "sinks": [имена]}]}`.
+    """
+    with open(path, encoding='UTF-8') as file:
+        config = json.load(file)
+    sinks = {
+        name: build_sink(name, options, bot, queue_size)
+        for name, options in config.get('sinks', {}).items()
+    }
+    return Router(sinks, config.get('routes', []), statuses)
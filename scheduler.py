@@ -0,0 +1,138 @@
+import heapq
+import itertools
+import random
+import time
+
+import metrics
+
+POLL_QUEUE_DUE = metrics.REGISTRY.gauge(
+    'bot_poll_queue_due', 'Подписки, срок опроса которых наступил')
+POLL_QUEUE_SIZE = metrics.REGISTRY.gauge(
+    'bot_poll_queue_size', 'Подписки в очереди опроса')
+
+
+class AdaptivePolicy:
+    """Интервал следующего опроса подписки.
+
+    Учитывает последний статус работы, число опросов без изменений
+    и то, в какие часы статусы меняются чаще всего.
+    """
+
+    STATUS_FACTORS = {
+        'reviewing': 0.0,
+        'rejected': 0.5,
+        'approved': 1.0,
+    }
+
+    def __init__(self, min_interval=60, max_interval=1800,
+                 default_interval=600, jitter=0.1, growth=1.5):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.default_interval = default_interval
+        self.jitter = jitter
+        self.growth = growth
+        self.hour_changes = [0] * 24
+
+    def base_interval(self, status):
+        """Базовый интервал по последнему статусу работы."""
+        factor = self.STATUS_FACTORS.get(status)
+        if factor is None:
+            return self.default_interval
+        return (self.min_interval
+                + (self.max_interval - self.min_interval) * factor)
+
+    def hour_factor(self, hour):
+        """Множитель интервала для часа суток по истории изменений."""
+        mean = sum(self.hour_changes) / 24
+        ratio = (self.hour_changes[hour] + 1) / (mean + 1)
+        return min(2.0, max(0.5, 1 / ratio))
+
+    def interval(self, subscription, now):
+        """Интервал до следующего опроса подписки."""
+        interval = self.base_interval(subscription.last_status)
+        interval *= self.growth ** min(subscription.idle_polls, 16)
+        interval *= self.hour_factor(time.localtime(now).tm_hour)
+        interval = min(self.max_interval, max(self.min_interval, interval))
+        spread = interval * self.jitter
+        return interval + random.uniform(-spread, spread)
+
+    def reschedule(self, subscription, changed, now=None):
+        """Запомнить результат опроса и назначить следующий."""
+        now = time.time() if now is None else now
+        if changed:
+            subscription.idle_polls = 0
+            self.hour_changes[time.localtime(now).tm_hour] += 1
+        else:
+            subscription.idle_polls += 1
+        subscription.next_poll_at = now + self.interval(subscription, now)
+        return subscription.next_poll_at
+
+
+class DueQueue:
+    """Очередь заданий опроса по времени срабатывания.
+
+    Мин-куча с ленивым удалением: перенос и отмена помечают старую
+    запись, а не ищут её в куче.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._entries = {}
+        self._counter = itertools.count()
+        self._removed = 0
+
+    def push(self, key, due):
+        """Добавить задание или перенести существующее, O(log n)."""
+        if key in self._entries:
+            self._discard(key)
+            self._compact()
+        entry = [due, next(self._counter), key, True]
+        self._entries[key] = entry
+        heapq.heappush(self._heap, entry)
+
+    def cancel(self, key):
+        """Отменить задание, O(1)."""
+        if key in self._entries:
+            self._discard(key)
+            self._compact()
+
+    def next_due(self):
+        """Время ближайшего задания или None, если очередь пуста."""
+        self._drop_removed()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now):
+        """Извлечь ключи всех заданий, срок которых наступил."""
+        keys = []
+        while self._heap:
+            due, _, key, alive = self._heap[0]
+            if alive and due > now:
+                break
+            heapq.heappop(self._heap)
+            if alive:
+                del self._entries[key]
+                keys.append(key)
+            else:
+                self._removed -= 1
+        return keys
+
+    def _discard(self, key):
+        self._entries.pop(key)[3] = False
+        self._removed += 1
+
+    def _drop_removed(self):
+        while self._heap and not self._heap[0][3]:
+            heapq.heappop(self._heap)
+            self._removed -= 1
+
+    def _compact(self):
+        if self._removed > len(self._entries):
+            self._heap = [entry for entry in self._heap if entry[3]]
+            heapq.heapify(self._heap)
+            self._removed = 0
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
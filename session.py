@@ -0,0 +1,43 @@
+class PracticumSession:
+    """Пул keep-alive соединений к API Практикума.
+
+    Соединения переиспользуются между циклами опроса и подписками,
+    пул общий для всех потоков процесса.
+    """
+
+    def __init__(self, pool_size=10, timeout=30):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.timeout = timeout
+        self._session = requests.Session()
+        self._adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=pool_size, pool_block=True)
+        self._session.mount('https://', self._adapter)
+        self._session.mount('http://', self._adapter)
+
+    def get(self, url, **kwargs):
+        """Выполнить GET-запрос через пул соединений."""
+        kwargs.setdefault('timeout', self.timeout)
+        return self._session.get(url, **kwargs)
+
+    def stats(self):
+        """Статистика пула: открыто, переиспользовано и простаивает."""
+        opened = sent = idle = 0
+        pools = self._adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            opened += pool.num_connections
+            sent += pool.num_requests
+            idle += sum(1 for conn in list(pool.pool.queue) if conn)
+        return {
+            'opened': opened,
+            'reused': max(0, sent - opened),
+            'idle': idle,
+        }
+
+    def close(self):
+        """Закрыть все соединения пула."""
+        self._session.close()
@@ -0,0 +1,251 @@
+import bisect
+import hashlib
+import logging
+import multiprocessing
+import sqlite3
+import threading
+import time
+
+
+def token_hash(token):
+    """Хеш токена: в таблице аренды сами токены не хранятся."""
+    return hashlib.blake2b(token.encode(), digest_size=8).hexdigest()
+
+
+class HashRing:
+    """Согласованное хеширование токенов по воркерам.
+
+    У каждого воркера `replicas` виртуальных точек на кольце, поэтому
+    при добавлении или уходе воркера переезжает ~1/N токенов.
+    """
+
+    def __init__(self, workers, replicas=64):
+        points = sorted(
+            (self._point(f'{worker}#{replica}'), worker)
+            for worker in workers
+            for replica in range(replicas)
+        )
+        self._points = [point for point, _ in points]
+        self._workers = [worker for _, worker in points]
+
+    @staticmethod
+    def _point(value):
+        return int.from_bytes(
+            hashlib.blake2b(value.encode(), digest_size=8).digest(), 'big')
+
+    def owner(self, key):
+        """Воркер, которому принадлежит ключ."""
+        if not self._points:
+            return None
+        index = bisect.bisect(self._points, self._point(key))
+        return self._workers[index % len(self._workers)]
+
+
+class ShardMember:
+    """Участник шардирования с арендой токенов в таблице SQLite.
+
+    Воркер регулярно отмечается в таблице, строит кольцо из живых
+    воркеров и берёт в аренду свои токены. Чужая аренда перехватывается
+    только после её истечения, поэтому два воркера не опрашивают
+    один токен одновременно.
+
+    Перед тем как отдать токены, вызывается `on_release` (сбросить
+    состояние в общее хранилище), после получения новых - `on_acquire`
+    с их хешами (перечитать состояние). `claim` отмечает ключ
+    уведомления в общей таблице, чтобы после переезда токена новый
+    владелец не отправил то же уведомление повторно. Отметка становится
+    окончательной после `confirm`, когда уведомление записано в журнал;
+    неподтверждённую отметку снимает `release`, её же перехватывает
+    этот воркер после перезапуска или другой, если воркер не жив.
+    """
+
+    def __init__(self, path, worker_id, lease_ttl=30, replicas=64,
+                 on_acquire=None, on_release=None,
+                 claim_retention=7 * 24 * 3600):
+        self.worker_id = str(worker_id)
+        self.lease_ttl = lease_ttl
+        self.replicas = replicas
+        self.on_acquire = on_acquire
+        self.on_release = on_release
+        self.claim_retention = claim_retention
+        self._owned = frozenset()
+        self._started = False
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._connection = sqlite3.connect(
+            path, timeout=30, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        with self._connection:
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS workers ('
+                'worker_id TEXT PRIMARY KEY, heartbeat REAL NOT NULL)')
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS leases ('
+                'token TEXT PRIMARY KEY, worker_id TEXT NOT NULL, '
+                'expires_at REAL NOT NULL)')
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS notifications ('
+                'key TEXT PRIMARY KEY, worker_id TEXT NOT NULL, '
+                'claimed_at REAL NOT NULL, '
+                'confirmed INTEGER NOT NULL DEFAULT 0)')
+
+    def owns(self, token):
+        """Арендован ли токен этим воркером."""
+        return token_hash(token) in self._owned
+
+    def live_workers(self, now):
+        """Воркеры, отметившиеся в пределах срока аренды."""
+        return [worker for worker, in self._connection.execute(
+            'SELECT worker_id FROM workers WHERE heartbeat >= ?',
+            (now - self.lease_ttl,))]
+
+    def claim(self, key):
+        """Занять ключ уведомления; False - его уже занял другой воркер."""
+        now = time.time()
+        with self._lock, self._connection:
+            return self._connection.execute(
+                'INSERT INTO notifications VALUES (?, ?, ?, 0) '
+                'ON CONFLICT(key) DO UPDATE SET '
+                'worker_id = excluded.worker_id, '
+                'claimed_at = excluded.claimed_at '
+                'WHERE notifications.confirmed = 0 '
+                'AND (notifications.worker_id = excluded.worker_id '
+                'OR notifications.worker_id NOT IN ('
+                'SELECT worker_id FROM workers WHERE heartbeat >= ?))',
+                (key, self.worker_id, now,
+                 now - self.lease_ttl)).rowcount == 1
+
+    def confirm(self, key):
+        """Закрепить ключ: уведомление записано в журнал."""
+        with self._lock, self._connection:
+            self._connection.execute(
+                'UPDATE notifications SET confirmed = 1 '
+                'WHERE key = ? AND worker_id = ?', (key, self.worker_id))
+
+    def release(self, key):
+        """Снять неподтверждённую отметку, если записать не удалось."""
+        with self._lock, self._connection:
+            self._connection.execute(
+                'DELETE FROM notifications '
+                'WHERE key = ? AND worker_id = ? AND confirmed = 0',
+                (key, self.worker_id))
+
+    def heartbeat(self, tokens):
+        """Отметиться, перестроить кольцо и обновить аренду."""
+        with self._lock:
+            owned, acquired = self._renew(tokens)
+        if acquired and self._started and self.on_acquire is not None:
+            self.on_acquire(acquired)
+        self._owned = owned
+        return len(owned)
+
+    def _renew(self, tokens):
+        now = time.time()
+        with self._connection:
+            self._connection.execute(
+                'INSERT OR REPLACE INTO workers VALUES (?, ?)',
+                (self.worker_id, now))
+            self._connection.execute(
+                'DELETE FROM workers WHERE heartbeat < ?',
+                (now - self.lease_ttl,))
+        ring = HashRing(self.live_workers(now), self.replicas)
+        wanted = {
+            key for key in map(token_hash, tokens)
+            if ring.owner(key) == self.worker_id
+        }
+        released = self._owned - wanted
+        if released:
+            self._owned = self._owned & wanted
+            if self.on_release is not None:
+                self.on_release(released)
+        with self._connection:
+            self._connection.executemany(
+                'DELETE FROM leases WHERE token = ? AND worker_id = ?',
+                ((key, self.worker_id) for key in released))
+            self._connection.executemany(
+                'INSERT INTO leases VALUES (?, ?, ?) '
+                'ON CONFLICT(token) DO UPDATE SET '
+                'worker_id = excluded.worker_id, '
+                'expires_at = excluded.expires_at '
+                'WHERE leases.worker_id = excluded.worker_id '
+                'OR leases.expires_at < ?',
+                ((key, self.worker_id, now + self.lease_ttl, now)
+                 for key in wanted))
+            self._connection.execute(
+                'DELETE FROM notifications WHERE claimed_at < ?',
+                (now - self.claim_retention,))
+        owned = frozenset(
+            key for key, in self._connection.execute(
+                'SELECT token FROM leases '
+                'WHERE worker_id = ? AND expires_at >= ?',
+                (self.worker_id, now)))
+        return owned, owned - self._owned
+
+    def start(self, tokens):
+        """Обновлять аренду в фоне; `tokens` возвращает все токены.
+
+        Состояние токенов, взятых первым обновлением, уже прочитано
+        при запуске, поэтому `on_acquire` для них не вызывается.
+        """
+        self.heartbeat(tokens())
+        self._started = True
+        self._thread = threading.Thread(
+            target=self._run, args=(tokens,), name='shard', daemon=True)
+        self._thread.start()
+
+    def _run(self, tokens):
+        while not self._stop.wait(self.lease_ttl / 3):
+            try:
+                self.heartbeat(tokens())
+            except Exception as error:
+                logging.error('Не удалось обновить аренду: %s', error)
+
+    def close(self):
+        """Остановить обновление и освободить аренду."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._owned = frozenset()
+        with self._lock, self._connection:
+            self._connection.execute(
+                'DELETE FROM leases WHERE worker_id = ?', (self.worker_id,))
+            self._connection.execute(
+                'DELETE FROM workers WHERE worker_id = ?', (self.worker_id,))
+        self._connection.close()
+
+
+def run_supervisor(count, target, restart_delay=5, stop=None,
+                   shutdown_timeout=30):
+    """Запустить `count` процессов-воркеров и перезапускать упавшие.
+
+    После `stop` воркеры получают SIGTERM и `shutdown_timeout` секунд
+    на плавную остановку, затем завершаются принудительно.
+    """
+    context = multiprocessing.get_context('spawn')
+    stop = stop or threading.Event()
+
+    def start(worker_id):
+        process = context.Process(
+            target=target, args=(worker_id,), name=f'worker-{worker_id}')
+        process.start()
+        return process
+
+    processes = {worker_id: start(worker_id) for worker_id in range(count)}
+    try:
+        while not stop.wait(restart_delay):
+            for worker_id, process in processes.items():
+                if not process.is_alive():
+                    logging.error(
+                        'Воркер %s завершился с кодом %s, перезапуск',
+                        worker_id, process.exitcode)
+                    processes[worker_id] = start(worker_id)
+    finally:
+        for process in processes.values():
+            process.terminate()
+        deadline = time.monotonic() + shutdown_timeout
+        for process in processes.values():
+            process.join(max(0, deadline - time.monotonic()))
+            if process.is_alive():
+                process.kill()
+                process.join()
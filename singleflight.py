@@ -0,0 +1,75 @@
+import threading
+import time
+from collections import OrderedDict
+
+import metrics
+
+FLIGHTS_SHARED = metrics.REGISTRY.counter(
+    'bot_singleflight_shared_total',
+    'Запросы, получившие результат чужого вызова')
+
+
+class Flight:
+    """Один вызов функции и его результат для всех ожидающих."""
+
+    __slots__ = ('done', 'result', 'error', 'expires_at')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.expires_at = 0
+
+
+class SingleFlight:
+    """Объединение одновременных вызовов с одинаковым ключом.
+
+    Первый вызов с ключом выполняет функцию, остальные ждут его
+    результата или исключения. С `linger` успешный результат ещё
+    столько секунд отдаётся вызовам с тем же ключом без повтора.
+    """
+
+    def __init__(self, linger=0):
+        self.linger = linger
+        self._running = {}
+        self._finished = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _join(self, key):
+        """Найти вызов с ключом или зарегистрировать новый."""
+        now = time.monotonic()
+        with self._lock:
+            while self._finished:
+                oldest = next(iter(self._finished.values()))
+                if oldest.expires_at > now:
+                    break
+                self._finished.popitem(last=False)
+            flight = self._running.get(key) or self._finished.get(key)
+            if flight is not None:
+                return flight, False
+            flight = self._running[key] = Flight()
+            return flight, True
+
+    def do(self, key, function):
+        """Вернуть результат `function()`, общий для вызовов с `key`."""
+        flight, leader = self._join(key)
+        if not leader:
+            FLIGHTS_SHARED.inc()
+            flight.done.wait()
+        else:
+            try:
+                flight.result = function()
+            except Exception as error:
+                flight.error = error
+            with self._lock:
+                del self._running[key]
+                if self.linger > 0 and flight.error is None:
+                    flight.expires_at = time.monotonic() + self.linger
+                    self._finished[key] = flight
+            flight.done.set()
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    def __len__(self):
+        return len(self._running) + len(self._finished)
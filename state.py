@@ -0,0 +1,134 @@
+import bisect
+from array import array
+from datetime import datetime
+
+STATUS_CODES = {}
+STATUS_NAMES = [None]
+
+
+def status_code(status):
+    """Небольшое целое для статуса работы; 0 - статуса нет."""
+    if status is None:
+        return 0
+    code = STATUS_CODES.get(status)
+    if code is None:
+        if len(STATUS_NAMES) > 255:
+            raise ValueError(f'Слишком много статусов работ - {status}')
+        code = STATUS_CODES[status] = len(STATUS_NAMES)
+        STATUS_NAMES.append(status)
+    return code
+
+
+for _status in ('reviewing', 'rejected', 'approved'):
+    status_code(_status)
+
+
+def parse_date(value):
+    """Время из date_updated ответа API в секундах Unix."""
+    if isinstance(value, (int, float)):
+        return int(value)
+    try:
+        return int(datetime.fromisoformat(
+            value.replace('Z', '+00:00')).timestamp())
+    except (AttributeError, TypeError, ValueError):
+        return 0
+
+
+class HomeworkStates:
+    """Состояние работ одной подписки в колонках-массивах.
+
+    Числовые id работ хранятся отсортированными в array('q'), статусы -
+    кодами в bytearray, время изменения - в array('q'). Работы без
+    числового id попадают в обычный словарь. Интерфейс get/[]/items
+    совпадает со словарём ключ работы -> статус.
+    """
+
+    __slots__ = ('_ids', '_codes', '_updated', '_names', '_other')
+
+    def __init__(self, statuses=None):
+        self._ids = array('q')
+        self._codes = bytearray()
+        self._updated = array('q')
+        self._names = []
+        self._other = None
+        for key, status in (statuses or {}).items():
+            self[key] = status
+
+    @staticmethod
+    def _numeric(key):
+        key = str(key)
+        return int(key) if key.isdigit() else None
+
+    def _index(self, number):
+        index = bisect.bisect_left(self._ids, number)
+        if index < len(self._ids) and self._ids[index] == number:
+            return index
+        return None
+
+    def get(self, key, default=None):
+        """Статус работы или `default`."""
+        number = self._numeric(key)
+        if number is None:
+            if self._other is None or str(key) not in self._other:
+                return default
+            return STATUS_NAMES[self._other[str(key)][0]]
+        index = self._index(number)
+        if index is None:
+            return default
+        return STATUS_NAMES[self._codes[index]]
+
+    def set(self, key, status, name=None, date_updated=None):
+        """Запомнить статус, название и время изменения работы."""
+        code = status_code(status)
+        updated = parse_date(date_updated) if date_updated else 0
+        number = self._numeric(key)
+        if number is None:
+            if self._other is None:
+                self._other = {}
+            self._other[str(key)] = (code, name, updated)
+            return
+        index = bisect.bisect_left(self._ids, number)
+        if index < len(self._ids) and self._ids[index] == number:
+            self._codes[index] = code
+            self._updated[index] = updated or self._updated[index]
+            if name is not None:
+                self._names[index] = name
+            return
+        self._ids.insert(index, number)
+        self._codes.insert(index, code)
+        self._updated.insert(index, updated)
+        self._names.insert(index, name)
+
+    def __setitem__(self, key, status):
+        self.set(key, status)
+
+    def __getitem__(self, key):
+        status = self.get(key, self)
+        if status is self:
+            raise KeyError(key)
+        return status
+
+    def __contains__(self, key):
+        return self.get(key, self) is not self
+
+    def __len__(self):
+        return len(self._ids) + len(self._other or ())
+
+    def records(self):
+        """Кортежи (ключ, название, статус, время изменения)."""
+        for number, code, updated, name in zip(
+                self._ids, self._codes, self._updated, self._names):
+            yield str(number), name, STATUS_NAMES[code], updated
+        for key, (code, name, updated) in (self._other or {}).items():
+            yield key, name, STATUS_NAMES[code], updated
+
+    def items(self):
+        """Пары ключ работы -> статус."""
+        for key, _, status, _ in self.records():
+            yield key, status
+
+    def __eq__(self, other):
+        return dict(self.items()) == dict(other.items())
+
+    def __repr__(self):
+        return f'HomeworkStates({dict(self.items())!r})'
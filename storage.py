@@ -0,0 +1,228 @@
+import abc
+import json
+import logging
+import os
+import sqlite3
+import threading
+
+
+class StateStore(abc.ABC):
+    """Хранилище курсоров и последних отправленных статусов.
+
+    Запись отложенная: изменения копятся в памяти и сбрасываются
+    пачкой фоновым потоком раз в `flush_interval` секунд.
+    """
+
+    def __init__(self, flush_interval=5):
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._cursors = {}
+        self._statuses = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def save_cursor(self, token, from_date):
+        """Запомнить курсор from_date подписки."""
+        with self._lock:
+            self._cursors[token] = from_date
+
+    def save_status(self, token, homework_id, status):
+        """Запомнить последний отправленный статус работы."""
+        with self._lock:
+            self._statuses[(token, str(homework_id))] = status
+
+    @abc.abstractmethod
+    def load(self):
+        """Прочитать состояние: курсоры и статусы по токенам."""
+
+    def load_keys(self, keys):
+        """Прочитать курсоры и статусы только для ключей `keys`."""
+        keys = set(keys)
+        cursors, statuses = self.load()
+        return (
+            {key: value for key, value in cursors.items() if key in keys},
+            {key: value for key, value in statuses.items() if key in keys})
+
+    def flush(self):
+        """Записать накопленные изменения одной пачкой.
+
+        Если запись не удалась, пачка возвращается в память и уйдёт
+        со следующим сбросом; более новые значения не затираются.
+        """
+        with self._lock:
+            cursors, self._cursors = self._cursors, {}
+            statuses, self._statuses = self._statuses, {}
+        if not (cursors or statuses):
+            return
+        try:
+            self._write(cursors, statuses)
+        except Exception:
+            with self._lock:
+                cursors.update(self._cursors)
+                statuses.update(self._statuses)
+                self._cursors, self._statuses = cursors, statuses
+            raise
+
+    @abc.abstractmethod
+    def _write(self, cursors, statuses):
+        """Записать пачку курсоров и статусов."""
+
+    def start(self):
+        """Запустить фоновый сброс изменений."""
+        self._thread = threading.Thread(
+            target=self._run, name='state-store', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as error:
+                logging.error('Не удалось сохранить состояние: %s', error)
+
+    def close(self):
+        """Остановить фоновый поток и сбросить остаток."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+
+
+class SQLiteStateStore(StateStore):
+    """Состояние в базе SQLite в режиме WAL."""
+
+    def __init__(self, path, flush_interval=5):
+        super().__init__(flush_interval)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS cursors ('
+            'token TEXT PRIMARY KEY, from_date INTEGER NOT NULL)')
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS statuses ('
+            'token TEXT NOT NULL, homework_id TEXT NOT NULL, '
+            'status TEXT NOT NULL, PRIMARY KEY (token, homework_id))')
+        self._connection.commit()
+
+    def load(self):
+        """Прочитать состояние из базы."""
+        cursors = dict(self._connection.execute(
+            'SELECT token, from_date FROM cursors'))
+        statuses = {}
+        for token, homework_id, status in self._connection.execute(
+                'SELECT token, homework_id, status FROM statuses'):
+            statuses.setdefault(token, {})[homework_id] = status
+        return cursors, statuses
+
+    def load_keys(self, keys, chunk_size=500):
+        """Прочитать из базы состояние только для ключей `keys`."""
+        keys = list(keys)
+        cursors, statuses = {}, {}
+        for start in range(0, len(keys), chunk_size):
+            chunk = keys[start:start + chunk_size]
+            marks = ', '.join('?' * len(chunk))
+            cursors.update(self._connection.execute(
+                f'SELECT token, from_date FROM cursors '
+                f'WHERE token IN ({marks})', chunk))
+            for token, homework_id, status in self._connection.execute(
+                    f'SELECT token, homework_id, status FROM statuses '
+                    f'WHERE token IN ({marks})', chunk):
+                statuses.setdefault(token, {})[homework_id] = status
+        return cursors, statuses
+
+    def _write(self, cursors, statuses):
+        with self._connection:
+            self._connection.executemany(
+                'INSERT OR REPLACE INTO cursors VALUES (?, ?)',
+                cursors.items())
+            self._connection.executemany(
+                'INSERT OR REPLACE INTO statuses VALUES (?, ?, ?)',
+                ((token, homework_id, status)
+                 for (token, homework_id), status in statuses.items()))
+
+    def close(self):
+        """Сбросить изменения и закрыть базу."""
+        super().close()
+        self._connection.close()
+
+
+class AppendOnlyStateStore(StateStore):
+    """Состояние в журнале JSON-строк, который только дописывается.
+
+    При загрузке журнал сжимается, если в нём больше записей,
+    чем вдвое от актуальных.
+    """
+
+    def __init__(self, path, flush_interval=5):
+        super().__init__(flush_interval)
+        self.path = path
+
+    def load(self):
+        """Прочитать состояние, воспроизведя журнал."""
+        cursors, statuses, records = self._replay()
+        live = len(cursors) + sum(map(len, statuses.values()))
+        if records > 2 * live:
+            self._compact(cursors, statuses)
+        return cursors, statuses
+
+    def load_keys(self, keys):
+        """Прочитать состояние для ключей `keys`, не сжимая журнал."""
+        keys = set(keys)
+        cursors, statuses, _ = self._replay()
+        return (
+            {key: value for key, value in cursors.items() if key in keys},
+            {key: value for key, value in statuses.items() if key in keys})
+
+    def _replay(self):
+        cursors, statuses, records = {}, {}, 0
+        if os.path.exists(self.path):
+            with open(self.path, encoding='UTF-8') as file:
+                for line in file:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        logging.warning('Пропущена повреждённая запись')
+                        continue
+                    records += 1
+                    if 'c' in record:
+                        token, from_date = record['c']
+                        cursors[token] = from_date
+                    else:
+                        token, homework_id, status = record['s']
+                        statuses.setdefault(token, {})[homework_id] = status
+        return cursors, statuses, records
+
+    def _compact(self, cursors, statuses):
+        temp_path = f'{self.path}.tmp'
+        with open(temp_path, 'w', encoding='UTF-8') as file:
+            self._dump(file, cursors, (
+                ((token, homework_id), status)
+                for token, homeworks in statuses.items()
+                for homework_id, status in homeworks.items()))
+        os.replace(temp_path, self.path)
+
+    def _write(self, cursors, statuses):
+        with open(self.path, 'a', encoding='UTF-8') as file:
+            self._dump(file, cursors, statuses.items())
+            file.flush()
+            os.fsync(file.fileno())
+
+    @staticmethod
+    def _dump(file, cursors, statuses):
+        lines = [json.dumps({'c': [token, from_date]})
+                 for token, from_date in cursors.items()]
+        lines.extend(json.dumps({'s': [token, homework_id, status]})
+                     for (token, homework_id), status in statuses)
+        file.write('\n'.join(lines) + '\n')
+
+
+def open_state_store(backend, path, flush_interval=5):
+    """Создать хранилище состояния по имени бэкенда."""
+    backends = {
+        'sqlite': SQLiteStateStore,
+        'aof': AppendOnlyStateStore,
+    }
+    if backend not in backends:
+        raise ValueError(f'Неизвестное хранилище состояния - {backend}')
+    return backends[backend](path, flush_interval)
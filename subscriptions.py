@@ -0,0 +1,145 @@
+import threading
+
+from state import HomeworkStates
+
+
+def subscription_key(token, chat_id):
+    """Ключ подписки в реестре и очереди опроса: (токен, чат)."""
+    return token, str(chat_id)
+
+
+class Subscription:
+    """Подписка: токен Практикума, чат и курсор from_date.
+
+    `state_key` - ключ курсора и статусов подписки в хранилище.
+    """
+
+    __slots__ = (
+        'token', 'chat_id', 'key', 'state_key', 'from_date', 'last_message',
+        'last_status', 'idle_polls', 'next_poll_at', 'statuses', 'paused',
+    )
+
+    def __init__(self, token, chat_id, from_date=0):
+        self.token = token
+        self.chat_id = chat_id
+        self.key = subscription_key(token, chat_id)
+        self.state_key = f'{token}:{chat_id}'
+        self.from_date = from_date
+        self.last_message = ''
+        self.last_status = None
+        self.idle_polls = 0
+        self.next_poll_at = 0
+        self.statuses = HomeworkStates()
+        self.paused = False
+
+    def __repr__(self):
+        return (f'Subscription(chat_id={self.chat_id!r}, '
+                f'from_date={self.from_date})')
+
+
+class SubscriptionRegistry:
+    """Реестр подписок, ключ - пара (токен Практикума, чат).
+
+    Один токен может быть подписан из нескольких чатов. Реестр хранит
+    индексы токен -> подписки и чат -> подписки и запоминает подписки,
+    добавленные после запуска, чтобы цикл опроса поставил их в очередь.
+    """
+
+    def __init__(self):
+        self._subscriptions = {}
+        self._by_token = {}
+        self._by_chat = {}
+        self._added = []
+        self._lock = threading.Lock()
+
+    def add(self, token, chat_id, from_date=0):
+        """Добавить подписку или вернуть существующую."""
+        key = subscription_key(token, chat_id)
+        with self._lock:
+            subscription = self._subscriptions.get(key)
+            if subscription is None:
+                subscription = Subscription(token, chat_id, from_date)
+                self._subscriptions[key] = subscription
+                self._by_token.setdefault(token, []).append(subscription)
+                self._by_chat.setdefault(key[1], set()).add(key)
+                self._added.append(key)
+        return subscription
+
+    def remove(self, token, chat_id):
+        """Удалить подписку, если она есть."""
+        key = subscription_key(token, chat_id)
+        with self._lock:
+            subscription = self._subscriptions.pop(key, None)
+            if subscription is not None:
+                self._by_token[token].remove(subscription)
+                if not self._by_token[token]:
+                    del self._by_token[token]
+                self._by_chat[key[1]].discard(key)
+                if not self._by_chat[key[1]]:
+                    del self._by_chat[key[1]]
+        return subscription
+
+    def get(self, key, chat_id=None):
+        """Подписка по ключу (токен, чат) или по токену и чату.
+
+        Для одного токена без чата возвращается первая подписка токена.
+        """
+        if chat_id is not None:
+            key = subscription_key(key, chat_id)
+        if isinstance(key, tuple):
+            return self._subscriptions.get(key)
+        subscriptions = self._by_token.get(key)
+        return subscriptions[0] if subscriptions else None
+
+    def for_token(self, token):
+        """Подписки всех чатов на токен."""
+        with self._lock:
+            return list(self._by_token.get(token, ()))
+
+    def for_chat(self, chat_id):
+        """Подписки чата."""
+        with self._lock:
+            keys = list(self._by_chat.get(str(chat_id), ()))
+        return [self._subscriptions[key] for key in keys
+                if key in self._subscriptions]
+
+    def take_added(self):
+        """Ключи подписок, добавленных с прошлого вызова."""
+        with self._lock:
+            added, self._added = self._added, []
+        return added
+
+    def tokens(self):
+        """Токены всех подписок без повторов."""
+        return list(self._by_token)
+
+    def __contains__(self, token):
+        return token in self._by_token
+
+    def __iter__(self):
+        return iter(list(self._subscriptions.values()))
+
+    def __len__(self):
+        return len(self._subscriptions)
+
+
+def load_subscriptions(path, registry, from_date=0):
+    """Загрузить подписки из файла строк вида `<токен> <chat_id>`."""
+    with open(path, encoding='UTF-8') as file:
+        for line_number, line in enumerate(file, start=1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            parts = line.split()
+            if len(parts) != 2:
+                raise ValueError(
+                    f'Неверная строка {line_number} в файле подписок {path}')
+            token, chat_id = parts
+            registry.add(token, chat_id, from_date)
+    return registry
+
+
+def save_subscription(path, token, chat_id):
+    """Дописать подписку в файл, чтобы она пережила перезапуск."""
+    with open(path, 'a', encoding='UTF-8') as file:
+        file.write(f'{token} {chat_id}\n')
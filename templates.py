@@ -0,0 +1,204 @@
+import functools
+import json
+import logging
+import os
+import threading
+
+NAME_MARK = '\x00'
+
+DEFAULT_TEMPLATES = {
+    'default_locale': 'ru',
+    'locales': {
+        'ru': {
+            'message': ('Изменился статус проверки работы '
+                        '"{homework_name}" {verdict}'),
+            'verdicts': {
+                'approved': 'Работа проверена: ревьюеру всё понравилось. Ура!',
+                'reviewing': 'Работа взята на проверку ревьюером.',
+                'rejected': 'Работа проверена: у ревьюера есть замечания.',
+            },
+        },
+        'en': {
+            'message': ('Review status of "{homework_name}" '
+                        'changed: {verdict}'),
+            'verdicts': {
+                'approved': 'The reviewer accepted the work. Hooray!',
+                'reviewing': 'The reviewer started reviewing the work.',
+                'rejected': 'The reviewer left some remarks.',
+            },
+        },
+    },
+    'chats': {},
+}
+
+
+def compile_template(message, verdict):
+    """Разбить шаблон на текст до и после названия работы.
+
+    Возвращает пару (начало, конец): сообщение - это
+    начало + название + конец, без разбора формата при отправке.
+    Шаблон, в котором {homework_name} встречается не ровно один раз,
+    отклоняется при загрузке.
+    """
+    text = message.format(homework_name=NAME_MARK, verdict=verdict)
+    if text.count(NAME_MARK) != 1:
+        raise ValueError(
+            f'{{homework_name}} должен встречаться в шаблоне ровно один '
+            f'раз: {message!r}')
+    head, _, tail = text.partition(NAME_MARK)
+    return head, tail
+
+
+def compile_locale(message, verdicts):
+    """Скомпилировать шаблоны всех статусов одного языка."""
+    return {
+        status: compile_template(message, verdict)
+        for status, verdict in verdicts.items()
+    }
+
+
+def compile_chats(config, locales, default_locale):
+    """Шаблоны чатов: ключ шаблонов для каждого чата.
+
+    Значение в "chats" - имя языка или объект с необязательными
+    "locale", "message" и "verdicts", которые переопределяют шаблоны
+    языка для этого чата. Такие чаты получают свой ключ `chat:<id>`.
+    """
+    chats, compiled = {}, {}
+    for chat, value in config.get('chats', {}).items():
+        chat = str(chat)
+        if not isinstance(value, dict):
+            chats[chat] = value
+            continue
+        base = locales.get(value.get('locale', default_locale))
+        if base is None:
+            raise ValueError(f'Нет шаблонов для языка чата {chat}')
+        key = f'chat:{chat}'
+        compiled[key] = compile_locale(
+            value.get('message', base['message']),
+            dict(base['verdicts'], **value.get('verdicts', {})))
+        chats[chat] = key
+    return chats, compiled
+
+
+class MessageTemplates:
+    """Шаблоны уведомлений по языкам и чатам.
+
+    Чату назначается язык или собственный шаблон (см. `compile_chats`).
+    Шаблоны компилируются один раз при загрузке, готовые тексты
+    кешируются в LRU по (шаблон, название работы, статус).
+    `reload` подменяет шаблоны и сбрасывает кеш на лету.
+    """
+
+    def __init__(self, config=None, path=None, cache_size=4096):
+        self.path = path
+        self.cache_size = cache_size
+        self._mtime = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+        self._apply(config or DEFAULT_TEMPLATES)
+
+    def _apply(self, config):
+        locales = config['locales']
+        compiled = {
+            locale: compile_locale(data['message'], data['verdicts'])
+            for locale, data in locales.items()
+        }
+        default_locale = config.get('default_locale', 'ru')
+        if default_locale not in compiled:
+            raise ValueError(f'Нет шаблонов для языка {default_locale}')
+        chats, chat_templates = compile_chats(
+            config, locales, default_locale)
+        compiled.update(chat_templates)
+        render = functools.lru_cache(maxsize=self.cache_size)(
+            functools.partial(self._render, compiled))
+        with self._lock:
+            self.default_locale = default_locale
+            self.chats = chats
+            self.render_cached = render
+
+    @staticmethod
+    def _render(compiled, locale, homework_name, status):
+        head, tail = compiled[locale][status]
+        return f'{head}{homework_name}{tail}'
+
+    def locale_for(self, chat_id):
+        """Язык или ключ собственных шаблонов чата."""
+        if chat_id is None:
+            return self.default_locale
+        return self.chats.get(str(chat_id), self.default_locale)
+
+    def set_locale(self, chat_id, locale):
+        """Назначить чату язык уведомлений."""
+        with self._lock:
+            self.chats = dict(self.chats, **{str(chat_id): locale})
+
+    def render(self, chat_id, homework_name, status):
+        """Текст уведомления о статусе работы для чата."""
+        render = self.render_cached
+        try:
+            return render(self.locale_for(chat_id), homework_name, status)
+        except KeyError:
+            return render(self.default_locale, homework_name, status)
+
+    def load(self, path=None):
+        """Загрузить шаблоны из JSON-файла."""
+        path = path or self.path
+        with open(path, encoding='UTF-8') as file:
+            config = json.load(file)
+        self._apply(config)
+        self.path = path
+        self._mtime = os.path.getmtime(path)
+
+    def reload(self):
+        """Перечитать файл шаблонов, не останавливая бота."""
+        if not self.path:
+            return False
+        try:
+            self.load()
+        except (OSError, ValueError, KeyError) as error:
+            logging.error('Не удалось перечитать шаблоны: %s', error)
+            return False
+        logging.info('Шаблоны сообщений перечитаны из %s', self.path)
+        return True
+
+    def reload_if_changed(self):
+        """Перечитать файл шаблонов, если он изменился."""
+        if not self.path:
+            return False
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return False
+        return mtime != self._mtime and self.reload()
+
+    def start(self, interval=5):
+        """Следить за файлом шаблонов в фоне."""
+        self._thread = threading.Thread(
+            target=self._run, args=(interval,), name='templates',
+            daemon=True)
+        self._thread.start()
+
+    def _run(self, interval):
+        while True:
+            requested = self._wake.wait(interval)
+            if self._stop.is_set():
+                return
+            self._wake.clear()
+            if requested:
+                self.reload()
+            else:
+                self.reload_if_changed()
+
+    def request_reload(self):
+        """Попросить фоновый поток перечитать файл; безопасно из сигнала."""
+        self._wake.set()
+
+    def close(self):
+        """Остановить слежение за файлом."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
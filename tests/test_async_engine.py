@@ -0,0 +1,105 @@
+import asyncio
+import threading
+import time
+
+import homework
+from async_engine import AsyncEngine
+from scheduler import AdaptivePolicy
+from subscriptions import SubscriptionRegistry
+
+
+class TestAsyncEngine:
+
+    def test_run_forever_respects_concurrency(self):
+        registry = SubscriptionRegistry()
+        for number in range(20):
+            registry.add(f'token{number}', number)
+        lock = threading.Lock()
+        stop = threading.Event()
+        state = {'active': 0, 'peak': 0, 'polled': 0}
+
+        def poll(bot, subscription):
+            with lock:
+                state['active'] += 1
+                state['peak'] = max(state['peak'], state['active'])
+            time.sleep(0.01)
+            with lock:
+                state['active'] -= 1
+                state['polled'] += 1
+                if state['polled'] == 20:
+                    stop.set()
+            return False
+
+        engine = AsyncEngine(poll, concurrency=4)
+        try:
+            asyncio.run(asyncio.wait_for(engine.run_forever(
+                None, registry, homework.build_queue(registry),
+                homework.build_policy(), stop), 5))
+        finally:
+            engine.close()
+        assert state['polled'] == 20
+        assert 1 < state['peak'] <= 4
+
+    def test_run_forever_skips_waiting_polls_after_stop(self):
+        registry = SubscriptionRegistry()
+        for number in range(5):
+            registry.add(f'token{number}', number)
+        stop = threading.Event()
+        polled = []
+
+        def poll(bot, subscription):
+            polled.append(subscription.token)
+            stop.set()
+            time.sleep(0.05)
+            return False
+
+        engine = AsyncEngine(poll, concurrency=1)
+        try:
+            asyncio.run(asyncio.wait_for(engine.run_forever(
+                None, registry, homework.build_queue(registry),
+                homework.build_policy(), stop), 5))
+        finally:
+            engine.close()
+        assert len(polled) == 1
+
+    def test_slow_poll_does_not_delay_other_subscriptions(self):
+        registry = SubscriptionRegistry()
+        registry.add('slow', 1)
+        registry.add('fast', 2)
+        stop = threading.Event()
+        polled = {'slow': [], 'fast': []}
+        started = time.monotonic()
+
+        def poll(bot, subscription):
+            polled[subscription.token].append(time.monotonic() - started)
+            if subscription.token == 'slow':
+                time.sleep(1)
+                stop.set()
+            return False
+
+        engine = AsyncEngine(poll, concurrency=5)
+        policy = AdaptivePolicy(min_interval=0.1, max_interval=0.1,
+                                default_interval=0.1, jitter=0)
+        try:
+            asyncio.run(asyncio.wait_for(engine.run_forever(
+                None, registry, homework.build_queue(registry), policy,
+                stop), 5))
+        finally:
+            engine.close()
+        assert len(polled['slow']) == 1
+        assert len([at for at in polled['fast'] if at < 0.9]) >= 4
+
+    def test_sync_loop_stops_between_polls(self):
+        registry = SubscriptionRegistry()
+        for number in range(5):
+            registry.add(f'token{number}', number)
+        stop = threading.Event()
+        polled = []
+
+        def poll(bot, subscription):
+            polled.append(subscription.token)
+            stop.set()
+            return False
+
+        homework.run_sync(None, registry, poll, stop)
+        assert len(polled) == 1
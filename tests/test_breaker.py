@@ -0,0 +1,60 @@
+import pytest
+
+import exceptions
+from breaker import CircuitBreaker
+
+
+def failing():
+    raise exceptions.ConnectinError('fail')
+
+
+class TestCircuitBreaker:
+
+    def test_opens_and_fails_fast(self):
+        breaker = CircuitBreaker(min_calls=4, base_delay=60, max_delay=60)
+        for _ in range(4):
+            with pytest.raises(exceptions.ConnectinError):
+                breaker.call(failing)
+        assert breaker.state == CircuitBreaker.OPEN
+        calls = []
+        with pytest.raises(exceptions.CircuitOpenError):
+            breaker.call(calls.append, 1)
+        assert calls == []
+
+    def test_half_open_probe(self, monkeypatch):
+        breaker = CircuitBreaker(min_calls=1, base_delay=1, max_delay=1)
+        with pytest.raises(exceptions.ConnectinError):
+            breaker.call(failing)
+        clock = [breaker._opened_until]
+        monkeypatch.setattr('breaker.time.monotonic', lambda: clock[0])
+        with pytest.raises(exceptions.ConnectinError):
+            breaker.call(failing)
+        assert breaker.state == CircuitBreaker.OPEN
+        clock[0] = breaker._opened_until
+        assert breaker.call(lambda: 'ok') == 'ok'
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    def test_backoff_bounded(self):
+        breaker = CircuitBreaker(base_delay=1, max_delay=30)
+        delays = [breaker._next_delay() for _ in range(50)]
+        assert all(1 <= delay <= 30 for delay in delays)
+
+    def test_client_errors_do_not_open(self):
+        import homework
+        from tests.test_cache import FakeResponse, FakeSession
+
+        breaker = CircuitBreaker(min_calls=2, base_delay=60, max_delay=60)
+        session = FakeSession(
+            [FakeResponse(b'', status_code=401) for _ in range(5)])
+        for _ in range(5):
+            with pytest.raises(exceptions.RequestRejected):
+                breaker.call(
+                    homework.request_statuses, 'revoked', 5, session)
+        assert breaker.state == CircuitBreaker.CLOSED
+        breaker = CircuitBreaker(min_calls=2, base_delay=60, max_delay=60)
+        session = FakeSession(
+            [FakeResponse(b'', status_code=503) for _ in range(2)])
+        for _ in range(2):
+            with pytest.raises(exceptions.InvalidResponseCode):
+                breaker.call(homework.request_statuses, 'token', 5, session)
+        assert breaker.state == CircuitBreaker.OPEN
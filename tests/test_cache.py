@@ -0,0 +1,111 @@
+from http import HTTPStatus
+
+import pytest
+
+from cache import ResponseCache
+
+
+class FakeResponse:
+
+    def __init__(self, content, status_code=HTTPStatus.OK, headers=None):
+        self.content = content
+        self.status_code = status_code
+        self.reason = HTTPStatus(status_code).phrase
+        self.headers = headers or {}
+
+    def json(self):
+        return {'homeworks': [], 'current_date': 1}
+
+
+class FakeSession:
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def get(self, url, headers=None, params=None, **kwargs):
+        self.requests.append(dict(headers))
+        return self.responses.pop(0)
+
+
+class TestResponseCache:
+
+    def test_identical_body_detected(self):
+        cache = ResponseCache()
+        assert not cache.store('key', FakeResponse(b'a'))
+        assert cache.store('key', FakeResponse(b'a'))
+        assert not cache.store('key', FakeResponse(b'b'))
+
+    def test_current_date_ignored(self):
+        cache = ResponseCache()
+        body = '{{"homeworks": [{{"id": 1}}], "current_date": {}}}'
+        assert not cache.store('key', FakeResponse(body.format(1).encode()))
+        assert cache.store('key', FakeResponse(body.format(2).encode()))
+        changed = body.replace('1}', '2}').format(3).encode()
+        assert not cache.store('key', FakeResponse(changed))
+
+    def test_lru_eviction_and_ttl(self):
+        cache = ResponseCache(max_entries=2, ttl=60)
+        for key in 'abc':
+            cache.store(key, FakeResponse(b''))
+        assert cache.get('a') is None
+        assert cache.get('c') is not None
+        cache = ResponseCache(ttl=0)
+        cache.store('a', FakeResponse(b''))
+        assert cache.get('a') is None
+
+    def test_request_statuses_conditional(self):
+        import homework
+
+        cache = ResponseCache()
+        session = FakeSession([
+            FakeResponse(b'{}', headers={'ETag': '"v1"'}),
+            FakeResponse(b'', status_code=HTTPStatus.NOT_MODIFIED),
+            FakeResponse(b'{}', headers={'ETag': '"v1"'}),
+        ])
+        assert homework.request_statuses('token', 5, session, cache) == {
+            'homeworks': [], 'current_date': 1}
+        assert homework.request_statuses('token', 5, session, cache) is None
+        assert session.requests[1]['If-None-Match'] == '"v1"'
+        assert homework.request_statuses('token', 5, session, cache) is None
+
+    def test_request_error_does_not_leak_token(self):
+        import homework
+
+        session = FakeSession([
+            FakeResponse(b'{}', status_code=HTTPStatus.UNAUTHORIZED)])
+        with pytest.raises(Exception) as error:
+            homework.request_statuses('secret-token', 5, session)
+        assert 'secret-token' not in str(error.value)
+        assert '401 Unauthorized' in str(error.value)
+
+    def test_failed_processing_is_retried(self):
+        import homework
+        from subscriptions import SubscriptionRegistry
+
+        body = (b'{"homeworks": [{"id": 1, "homework_name": "hw.zip", '
+                b'"status": "approved"}], "current_date": %d}')
+        session = FakeSession([
+            FakeResponse(body % number, headers={'ETag': f'"{number}"'})
+            for number in range(2)])
+
+        class FlakyBot:
+
+            def __init__(self):
+                self.messages = []
+
+            def send_message(self, chat_id=None, text=None):
+                self.messages.append(text)
+                if len(self.messages) == 1:
+                    raise ConnectionError('сеть недоступна')
+
+        bot = FlakyBot()
+        subscription = SubscriptionRegistry().add('token', 1, 5)
+        cache = ResponseCache()
+        poll = lambda: homework.poll_subscription(  # noqa: E731
+            bot, subscription, session=session, cache=cache)
+        assert not poll()
+        assert poll()
+        assert 'If-None-Match' not in session.requests[1]
+        assert subscription.statuses.get('1') == 'approved'
+        assert len(bot.messages) == 3
@@ -0,0 +1,24 @@
+from changes import detect_changes
+
+
+class TestDetectChanges:
+
+    def test_every_transition_is_reported(self):
+        statuses = {'1': 'reviewing', '2': 'reviewing', '3': 'approved'}
+        homeworks = [
+            {'id': 1, 'homework_name': 'hw1', 'status': 'approved'},
+            {'id': 2, 'homework_name': 'hw2', 'status': 'rejected'},
+            {'id': 3, 'homework_name': 'hw3', 'status': 'approved'},
+            {'id': 4, 'homework_name': 'hw4', 'status': 'reviewing'},
+        ]
+        changes = detect_changes(statuses, homeworks)
+        assert [(change.key, change.old_status, change.new_status)
+                for change in changes] == [
+            ('4', None, 'reviewing'),
+            ('2', 'reviewing', 'rejected'),
+            ('1', 'reviewing', 'approved'),
+        ]
+
+    def test_key_falls_back_to_homework_name(self):
+        changes = detect_changes({}, [{'homework_name': 'hw', 'status': 'x'}])
+        assert changes[0].key == 'hw'
@@ -0,0 +1,61 @@
+from commands import CommandService
+from history import StatusHistory
+from subscriptions import SubscriptionRegistry
+
+
+def make_service(tmp_path=None):
+    registry = SubscriptionRegistry()
+    subscription = registry.add('token-abcd', 10)
+    subscription.statuses.set(1, 'reviewing', 'hw01.zip', 100)
+    subscription.statuses.set(2, 'approved', 'hw02.zip', 200)
+    path = None if tmp_path is None else str(tmp_path / 'subscriptions')
+    return registry, CommandService(registry, path)
+
+
+class TestCommandService:
+
+    def test_status_answers_from_memory(self):
+        _, service = make_service()
+        answer = service.handle(10, 'status')
+        assert '…abcd' in answer
+        assert answer.index('hw02.zip: approved') < answer.index(
+            'hw01.zip: reviewing')
+        assert 'Подписок нет' in service.handle(11, 'status')
+
+    def test_subscribe_adds_and_saves(self, tmp_path):
+        registry, service = make_service(tmp_path)
+        registry.take_added()
+        answer = service.handle(11, 'subscribe', ['token-new1'])
+        assert 'оформлена' in answer
+        assert registry.take_added() == [('token-new1', '11')]
+        assert [sub.token for sub in registry.for_chat(11)] == ['token-new1']
+        assert (tmp_path / 'subscriptions').read_text() == 'token-new1 11\n'
+        assert 'уже подписан' in service.handle(11, 'subscribe', ['token-new1'])
+
+    def test_pause_and_resume(self):
+        registry, service = make_service()
+        service.handle(10, 'pause')
+        assert registry.get('token-abcd').paused
+        assert '(пауза)' in service.handle(10, 'status')
+        service.handle(10, 'resume')
+        assert not registry.get('token-abcd').paused
+
+    def test_history_is_newest_first(self):
+        _, service = make_service()
+        lines = service.handle(10, 'history', ['1']).splitlines()
+        assert lines == ['1970-01-01 00:03 UTC hw02.zip: approved']
+        assert 'Использование' in service.handle(10, 'history', ['x'])
+
+    def test_history_lists_every_transition(self, tmp_path):
+        registry, _ = make_service()
+        history = StatusHistory(str(tmp_path))
+        transitions = [('', 'reviewing', 60), ('reviewing', 'rejected', 120),
+                       ('rejected', 'reviewing', 180)]
+        for old, new, at in transitions:
+            history.record('token-abcd', 1, 'hw01.zip', old, new, at)
+        service = CommandService(registry, history=history)
+        assert service.handle(10, 'history', ['2']).splitlines() == [
+            '1970-01-01 00:03 UTC hw01.zip: reviewing',
+            '1970-01-01 00:02 UTC hw01.zip: rejected',
+        ]
+        history.close()
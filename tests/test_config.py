@@ -0,0 +1,41 @@
+import os
+import subprocess
+import sys
+
+from config import load_env, validate_tokens
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestConfig:
+
+    def test_load_env_simple_lines(self, tmp_path, monkeypatch):
+        path = tmp_path / '.env'
+        path.write_text(
+            '# comment\n'
+            'export BOT_TEST_A=1234:abc\n'
+            "BOT_TEST_B='в кавычках # не комментарий'\n"
+            'BOT_TEST_C=value # комментарий\n'
+            'BOT_TEST_D=from-file\n',
+            encoding='UTF-8')
+        monkeypatch.setenv('BOT_TEST_D', 'from-env')
+        for key in ('BOT_TEST_A', 'BOT_TEST_B', 'BOT_TEST_C'):
+            monkeypatch.delenv(key, raising=False)
+        assert load_env(str(path))
+        assert os.environ['BOT_TEST_A'] == '1234:abc'
+        assert os.environ['BOT_TEST_B'] == 'в кавычках # не комментарий'
+        assert os.environ['BOT_TEST_C'] == 'value'
+        assert os.environ['BOT_TEST_D'] == 'from-env'
+
+    def test_validate_tokens(self):
+        assert validate_tokens('1234:abc-DEF_1', '-100200') == []
+        assert len(validate_tokens('token', 'chat')) == 2
+
+    def test_import_defers_heavy_modules(self):
+        code = ('import sys, homework; print(sorted(name for name in '
+                '("telegram", "requests", "asyncio", "dotenv") '
+                'if name in sys.modules))')
+        result = subprocess.run(
+            [sys.executable, '-c', code], cwd=ROOT,
+            capture_output=True, text=True, check=True)
+        assert result.stdout.strip() == '[]'
@@ -0,0 +1,56 @@
+import json
+
+import pytest
+
+import decoding
+import exceptions
+from decoding import decode_response
+
+STATUSES = {'approved', 'reviewing', 'rejected'}
+
+
+def encode(data):
+    return json.dumps(data).encode('UTF-8')
+
+
+class TestDecodeResponse:
+
+    def test_records(self):
+        response = decode_response(encode({
+            'homeworks': [{'id': 1, 'homework_name': 'hw', 'status':
+                           'approved', 'lesson_name': 'Урок'}],
+            'current_date': 10,
+        }), STATUSES)
+        assert response.current_date == 10
+        record = response.homeworks[0]
+        assert record.get('homework_name') == 'hw'
+        assert 'status' in record and 'lesson_name' not in record
+        assert record.get('missing', 'default') == 'default'
+
+    @pytest.mark.parametrize('data, error', [
+        ([], TypeError),
+        ({'current_date': 1}, exceptions.EmptyResponseFromAPI),
+        ({'homeworks': {}, 'current_date': 1}, KeyError),
+        ({'homeworks': [{'status': 'approved'}], 'current_date': 1},
+         KeyError),
+        ({'homeworks': ['hw'], 'current_date': 1}, TypeError),
+        ({'homeworks': [{'homework_name': 'hw', 'status': 'unknown'}],
+          'current_date': 1}, ValueError),
+    ])
+    def test_invalid_response(self, data, error):
+        with pytest.raises(error):
+            decode_response(encode(data), STATUSES)
+
+    @pytest.mark.parametrize('compact', [True, False])
+    def test_invalid_json(self, compact, monkeypatch):
+        monkeypatch.setattr(decoding, 'COMPACT_RECORDS', compact)
+        if not compact:
+            monkeypatch.setattr(decoding, 'loads', json.loads)
+        with pytest.raises(exceptions.ConnectinError):
+            decode_response(b'not json', STATUSES)
+        with pytest.raises(exceptions.ConnectinError):
+            decode_response(b'\xff', STATUSES)
+        response = decode_response(encode({
+            'homeworks': [{'homework_name': 'hw', 'status': 'approved'}],
+            'current_date': 1}), STATUSES)
+        assert response.homeworks[0].get('status') == 'approved'
@@ -0,0 +1,84 @@
+import threading
+import time
+
+from telegram.error import RetryAfter
+
+import metrics
+from delivery import DeliveryQueue, TokenBucket
+
+
+class RecordingBot:
+
+    def __init__(self, fail_times=0):
+        self.fail_times = fail_times
+        self.messages = []
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        if self.fail_times:
+            self.fail_times -= 1
+            raise RetryAfter(0.01)
+        self.messages.append((chat_id, text))
+
+
+class TestDelivery:
+
+    def test_token_bucket(self):
+        bucket = TokenBucket(rate=2, capacity=1, now=0)
+        assert bucket.take(0)
+        assert not bucket.take(0.1)
+        assert bucket.delay(0.1) == 0.4
+        assert bucket.take(0.5)
+
+    def test_pending_texts_coalesced(self):
+        bot = RecordingBot()
+        queue = DeliveryQueue(bot, chat_rate=100, global_rate=100)
+        for text in ('one', 'two', 'three'):
+            queue.send_message(chat_id=1, text=text)
+        queue.send_message(chat_id=2, text='other')
+        queue.start()
+        queue.close()
+        assert sorted(bot.messages) == [(1, 'one\n\ntwo\n\nthree'),
+                                        (2, 'other')]
+        assert queue.sent == 4
+
+    def test_retry_after(self):
+        calls = metrics.REGISTRY.counter(
+            'bot_calls_total', function='send_message')
+        before = calls.value
+        bot = RecordingBot(fail_times=2)
+        queue = DeliveryQueue(bot, chat_rate=100, global_rate=100)
+        queue.start()
+        queue.send_message(chat_id=1, text='text')
+        queue.close()
+        assert bot.messages == [(1, 'text')]
+        assert calls.value - before == 3
+
+    def test_on_done_reports_result(self):
+        results = []
+        queue = DeliveryQueue(RecordingBot(), chat_rate=100, global_rate=100)
+        queue.send_message(chat_id=1, text='one', on_done=results.append)
+        queue.send_message(chat_id=1, text='two', on_done=results.append)
+        queue.start()
+        queue.close()
+        assert results == [True, True]
+
+    def test_rate_limited_chat_does_not_block_others(self):
+        bot = RecordingBot()
+        queue = DeliveryQueue(bot, chat_rate=0.5, global_rate=100)
+        queue.start()
+        sent = threading.Event()
+        queue.send_message(chat_id=0, text='first',
+                           on_done=lambda result: sent.set())
+        assert sent.wait(1)
+        started = time.monotonic()
+        others = threading.Event()
+        queue.send_message(chat_id=0, text='second')
+        for chat_id in range(1, 6):
+            queue.send_message(
+                chat_id=chat_id, text='text',
+                on_done=lambda result, chat_id=chat_id:
+                chat_id == 5 and others.set())
+        assert others.wait(1)
+        assert time.monotonic() - started < 0.5
+        queue.close()
+        assert bot.messages[-1] == (0, 'second')
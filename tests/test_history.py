@@ -0,0 +1,54 @@
+import os
+
+from history import StatusHistory
+
+DAY = 24 * 3600
+
+
+def fill(history):
+    history.record('token', 1, 'hw01', None, 'reviewing', 1000)
+    history.record('token', 1, 'hw01', 'reviewing', 'rejected', 1600)
+    history.record('token', 1, 'hw01', 'rejected', 'reviewing', 2000)
+    history.record('token', 1, 'hw01', 'reviewing', 'approved', 2400 + DAY)
+    history.record('other', 7, 'hw07', None, 'reviewing', 1500)
+
+
+class TestStatusHistory:
+
+    def test_incremental_aggregates(self, tmp_path):
+        history = StatusHistory(str(tmp_path))
+        fill(history)
+        stats = history.stats('token')['1']
+        assert stats['status'] == 'approved'
+        assert stats['reviewing_seconds'] == 600 + 400 + DAY
+        assert stats['rejections'] == 1
+        assert stats['turnaround_seconds'] == 1400 + DAY
+        assert history.stats('other', now=1600)['7']['reviewing_seconds'] == 100
+
+    def test_events_by_token_and_period(self, tmp_path):
+        history = StatusHistory(str(tmp_path))
+        fill(history)
+        history.close()
+        assert sorted(os.listdir(tmp_path)) == [
+            '19700101.idx', '19700101.jsonl', '19700102.idx',
+            '19700102.jsonl', 'aggregates.json']
+        statuses = [event['s'] for event in history.events('token')]
+        assert statuses == ['reviewing', 'rejected', 'reviewing', 'approved']
+        assert [event['s'] for event in history.events(
+            'token', since=DAY)] == ['approved']
+        assert len(history.events('other')) == 1
+
+    def test_reopen_replays_tail_after_snapshot(self, tmp_path):
+        history = StatusHistory(str(tmp_path))
+        fill(history)
+        history.close()
+        history = StatusHistory(str(tmp_path), snapshot_interval=3600)
+        history.record('token', 2, 'hw02', None, 'rejected', 3000)
+        history.flush()
+        index = tmp_path / '19700101.idx'
+        index.write_text(''.join(index.read_text().splitlines(True)[:-1]))
+
+        reopened = StatusHistory(str(tmp_path))
+        assert reopened.stats('token')['2']['rejections'] == 1
+        assert reopened.stats('token')['1']['rejections'] == 1
+        assert len(reopened.events('token')) == 5
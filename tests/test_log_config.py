@@ -0,0 +1,32 @@
+import json
+import logging
+
+import log_config
+
+
+class TestLogConfig:
+
+    def test_json_lines_written_by_listener(self, tmp_path):
+        path = tmp_path / 'log.txt'
+        root = logging.getLogger()
+        handlers, level = root.handlers[:], root.level
+        listener = log_config.setup_logging('json', str(path))
+        try:
+            logging.info('Загружено подписок: %d', 3)
+        finally:
+            log_config.stop_listener(listener)
+            root.handlers[:] = handlers
+            root.setLevel(level)
+        record = json.loads(path.read_text(encoding='UTF-8'))
+        assert record['message'] == 'Загружено подписок: 3'
+        assert record['level'] == 'INFO'
+
+    def test_full_queue_drops_records(self):
+        import queue
+
+        handler = log_config.DeferredQueueHandler(queue.Queue(maxsize=1))
+        dropped = log_config.DeferredQueueHandler.dropped
+        record = logging.LogRecord('x', logging.INFO, '', 0, 'msg', (), None)
+        handler.handle(record)
+        handler.handle(record)
+        assert log_config.DeferredQueueHandler.dropped == dropped + 1
@@ -0,0 +1,46 @@
+import urllib.request
+
+import pytest
+
+import metrics
+
+
+class TestMetrics:
+
+    def test_timed_counts_calls_and_errors(self):
+        registry = metrics.Registry()
+
+        @metrics.timed('func', registry)
+        def func(fail):
+            if fail:
+                raise ValueError
+            return 'ok'
+
+        assert func(False) == 'ok'
+        with pytest.raises(ValueError):
+            func(True)
+        snapshot = registry.snapshot()
+        assert snapshot['bot_calls_total{function="func"}'] == 2
+        assert snapshot['bot_call_errors_total{function="func"}'] == 1
+        duration = snapshot['bot_call_duration_seconds{function="func"}']
+        assert duration['count'] == 2
+
+    def test_histogram_buckets(self):
+        histogram = metrics.Histogram(buckets=(1, 10))
+        for value in (0.5, 5, 50):
+            histogram.observe(value)
+        assert histogram.sample()['buckets'] == {1: 1, 10: 2}
+        assert histogram.sample()['count'] == 3
+
+    def test_metrics_endpoint(self):
+        metrics.REGISTRY.counter('bot_test_total', 'Тест').inc()
+        server = metrics.start_server(0)
+        try:
+            url = f'http://127.0.0.1:{server.server_address[1]}/metrics'
+            with urllib.request.urlopen(url) as response:
+                body = response.read().decode('UTF-8')
+        finally:
+            server.shutdown()
+            server.server_close()
+        assert '# TYPE bot_test_total counter' in body
+        assert 'bot_test_total 1' in body
@@ -0,0 +1,169 @@
+import threading
+import time
+
+import pytest
+
+from outbox import AppendOnlyOutbox, SQLiteOutbox
+from sharding import ShardMember
+
+
+class RecordingSink:
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.messages = []
+
+    def send_message(self, chat_id=None, text=None, on_done=None):
+        self.messages.append((chat_id, text))
+        on_done(not self.fail)
+
+
+@pytest.fixture(params=[SQLiteOutbox, AppendOnlyOutbox])
+def outbox_path(request, tmp_path):
+    return request.param, str(tmp_path / 'outbox')
+
+
+class TestOutbox:
+
+    def test_duplicate_key_sent_once(self, outbox_path):
+        outbox_class, path = outbox_path
+        sink = RecordingSink()
+        outbox = outbox_class(path, sink)
+        outbox.put('key', 1, 'text')
+        outbox.put('key', 1, 'text')
+        outbox.close()
+
+        outbox = outbox_class(path, sink)
+        outbox.recover()
+        outbox.put('key', 1, 'text')
+        outbox.close()
+        assert sink.messages == [('1', 'text')]
+
+    def test_claimed_key_skipped(self, outbox_path, tmp_path):
+        outbox_class, path = outbox_path
+        shards = str(tmp_path / 'shards.sqlite3')
+        other, member = ShardMember(shards, 0), ShardMember(shards, 1)
+        other.heartbeat(['token'])
+        assert other.claim('taken')
+        sink = RecordingSink()
+        outbox = outbox_class(path, sink, claims=member)
+        outbox.put('taken', 1, 'other worker')
+        outbox.put('key', 1, 'text')
+        outbox.close()
+        assert sink.messages == [('1', 'text')]
+        assert not other.claim('key')
+
+        other.close()
+        assert member.claim('taken')
+        member.close()
+
+    def test_claim_released_when_write_fails(self, outbox_path, tmp_path):
+        outbox_class, path = outbox_path
+        shards = str(tmp_path / 'shards.sqlite3')
+        first, second = ShardMember(shards, 0), ShardMember(shards, 1)
+        first.heartbeat(['token'])
+        second.heartbeat(['token'])
+        outbox = outbox_class(path, RecordingSink(), claims=first)
+
+        def fail(entries, acks, dead):
+            raise OSError('диск заполнен')
+
+        outbox._write = fail
+        with pytest.raises(OSError):
+            outbox.put('key', 1, 'text')
+        assert second.claim('key')
+        first.close()
+        second.close()
+
+    def test_unacked_entries_resent_after_restart(self, outbox_path):
+        outbox_class, path = outbox_path
+        outbox = outbox_class(path, RecordingSink(fail=True))
+        outbox.put('key', 1, 'text')
+        outbox.close()
+
+        sink = RecordingSink()
+        outbox = outbox_class(path, sink)
+        outbox.recover()
+        outbox.close()
+        assert sink.messages == [('1', 'text')]
+
+        outbox = outbox_class(path, sink)
+        outbox.recover()
+        outbox.close()
+        assert len(sink.messages) == 1
+
+    def test_group_commit(self, outbox_path):
+        outbox_class, path = outbox_path
+        sink = RecordingSink()
+        outbox = outbox_class(path, sink, commit_interval=0.05)
+        outbox.start()
+        threads = [
+            threading.Thread(target=outbox.put, args=(f'key{number}', 1, 't'))
+            for number in range(20)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        outbox.close()
+        assert len(sink.messages) == 20
+        assert outbox.commits < 20
+
+    def test_entry_dropped_after_max_attempts(self, outbox_path):
+        outbox_class, path = outbox_path
+        sink = RecordingSink(fail=True)
+        outbox = outbox_class(path, sink, max_attempts=3)
+        outbox.put('key', 1, 'text')
+        for _ in range(4):
+            outbox._redeliver(time.time())
+        outbox.close()
+        assert len(sink.messages) == 3
+
+        outbox = outbox_class(path, sink)
+        outbox.recover()
+        outbox.close()
+        assert len(sink.messages) == 3
+
+    def test_expired_entries_pruned_from_log(self, tmp_path):
+        path = tmp_path / 'outbox'
+        outbox = AppendOnlyOutbox(str(path), RecordingSink())
+        for number in range(50):
+            outbox.put(f'key{number}', 1, 'text')
+        outbox._commit()
+        size = path.stat().st_size
+        outbox._prune(time.time() + 1)
+        outbox.close()
+        assert path.stat().st_size < size / 10
+
+        outbox = AppendOnlyOutbox(str(path), RecordingSink(), retention=0)
+        outbox.put('key0', 1, 'text')
+        outbox.close()
+        assert len(path.read_text().splitlines()) == 2
+
+    def test_failed_commit_raises_and_keeps_batch(self, outbox_path):
+        outbox_class, path = outbox_path
+        sink = RecordingSink()
+        outbox = outbox_class(path, sink, commit_interval=0.01)
+        write = outbox._write
+        failures = []
+
+        def fail_once(entries, acks, dead):
+            if not failures:
+                failures.append(entries)
+                raise OSError('диск заполнен')
+            return write(entries, acks, dead)
+
+        outbox._write = fail_once
+        outbox.start()
+        with pytest.raises(RuntimeError):
+            outbox.put('k1', 1, 'first')
+        outbox.put('k2', 1, 'second')
+        outbox.put('k1', 1, 'first')
+        outbox.close()
+        assert sorted(sink.messages) == [('1', 'first'), ('1', 'second')]
+
+        sink = RecordingSink()
+        outbox = outbox_class(path, sink)
+        outbox.recover()
+        outbox.close()
+        assert sink.messages == []
@@ -0,0 +1,134 @@
+import json
+import smtplib
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+from changes import StatusChange
+from routing import FileSink, Router, Sink, load_routes
+
+
+def make_change(status='approved', date='2022-01-01T00:00:00Z'):
+    homework = {'homework_name': 'hw.zip', 'status': status,
+                'date_updated': date}
+    return StatusChange(1, homework, 'reviewing', status)
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+class RecordingSink(Sink):
+
+    def __init__(self, name, release=None, **kwargs):
+        super().__init__(name, **kwargs)
+        self.release = release
+        self.events = []
+
+    def deliver(self, event):
+        if self.release is not None:
+            self.release.wait(5)
+        self.events.append(event)
+
+
+class TestRouter:
+
+    def test_rules_are_merged_per_token_and_status(self):
+        sinks = {name: RecordingSink(name)
+                 for name in ('all', 'approved', 'student', 'mentor')}
+        router = Router(sinks, [
+            {'sinks': ['all']},
+            {'statuses': ['approved'], 'sinks': ['approved']},
+            {'tokens': ['student'], 'sinks': ['student']},
+            {'tokens': ['student'], 'statuses': ['rejected'],
+             'sinks': ['mentor', 'all']},
+        ], statuses=('approved', 'reviewing', 'rejected'))
+        names = lambda token, status: [  # noqa: E731
+            sink.name for sink in router.match(token, status)]
+        assert names('student', 'rejected') == ['mentor', 'all', 'student']
+        assert names('student', 'approved') == ['student', 'approved', 'all']
+        assert names('other', 'approved') == ['approved', 'all']
+        assert names('other', 'reviewing') == ['all']
+        with pytest.raises(ValueError):
+            Router(sinks, [{'sinks': ['missing']}])
+
+    def test_slow_sink_does_not_delay_others(self, tmp_path):
+        release = threading.Event()
+        slow = RecordingSink('slow', release, queue_size=1)
+        path = tmp_path / 'events.jsonl'
+        router = Router(
+            {'slow': slow, 'file': FileSink('file', str(path))},
+            [{'sinks': ['slow', 'file']}])
+        router.start()
+        for number in range(4):
+            router.route('token', 1, make_change(date=str(number)), 'text')
+        router.route('token', 2, make_change(date='3'), 'text')
+        wait_for(lambda: path.exists()
+                 and len(path.read_text().splitlines()) == 4)
+        assert slow.events == []
+        release.set()
+        router.close(5)
+        assert 1 <= len(slow.events) < 4
+        event = json.loads(path.read_text().splitlines()[0])
+        assert event['status'] == 'approved'
+        assert event['token'] != 'token'
+
+    def test_webhook_and_smtp_sinks(self, tmp_path, monkeypatch):
+        received = []
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def do_POST(self):
+                length = int(self.headers['Content-Length'])
+                received.append(json.loads(self.rfile.read(length)))
+                self.send_response(204)
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        server = HTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        mails = []
+
+        class LocalSMTP:
+
+            def __init__(self, host, port, timeout=None):
+                self.address = (host, port)
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *args):
+                pass
+
+            def send_message(self, message):
+                mails.append((self.address, message))
+
+        monkeypatch.setattr(smtplib, 'SMTP', LocalSMTP)
+        path = tmp_path / 'routes.json'
+        path.write_text(json.dumps({
+            'sinks': {
+                'hook': {'type': 'webhook',
+                         'url': f'http://127.0.0.1:{server.server_port}/'},
+                'mail': {'type': 'smtp', 'port': 2525,
+                         'recipients': ['mentor@example.com']},
+            },
+            'routes': [{'statuses': ['approved'], 'sinks': ['hook', 'mail']}],
+        }))
+        router = load_routes(str(path), statuses=('approved', 'rejected'))
+        router.start()
+        assert router.route('token', 1, make_change('rejected'), 'no') == 0
+        assert router.route('token', 1, make_change(), 'Ура') == 2
+        router.close(5)
+        server.shutdown()
+        server.server_close()
+        assert [event['message'] for event in received] == ['Ура']
+        (address, message), = mails
+        assert address == ('localhost', 2525)
+        assert message['Subject'] == 'hw.zip: approved'
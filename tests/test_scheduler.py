@@ -0,0 +1,55 @@
+from scheduler import AdaptivePolicy, DueQueue
+from subscriptions import Subscription
+
+
+class TestAdaptivePolicy:
+
+    def make_policy(self):
+        return AdaptivePolicy(
+            min_interval=60, max_interval=1800, default_interval=600,
+            jitter=0)
+
+    def test_reviewing_polled_more_often_than_approved(self):
+        policy = self.make_policy()
+        reviewing = Subscription('a', 1)
+        reviewing.last_status = 'reviewing'
+        approved = Subscription('b', 2)
+        approved.last_status = 'approved'
+        assert (policy.reschedule(reviewing, True, now=0)
+                < policy.reschedule(approved, True, now=0))
+
+    def test_interval_grows_while_idle_and_is_bounded(self):
+        policy = self.make_policy()
+        subscription = Subscription('a', 1)
+        intervals = []
+        for _ in range(20):
+            intervals.append(
+                policy.reschedule(subscription, False, now=0))
+        assert intervals == sorted(intervals)
+        assert max(intervals) <= 1800
+        policy.reschedule(subscription, True, now=0)
+        assert subscription.idle_polls == 0
+
+
+class TestDueQueue:
+
+    def test_pop_due_in_order(self):
+        queue = DueQueue()
+        queue.push('b', 20)
+        queue.push('a', 10)
+        queue.push('c', 30)
+        assert queue.next_due() == 10
+        assert queue.pop_due(25) == ['a', 'b']
+        assert len(queue) == 1
+
+    def test_reschedule_and_cancel(self):
+        queue = DueQueue()
+        for number in range(10):
+            queue.push(number, number)
+        queue.push(0, 100)
+        queue.cancel(1)
+        assert queue.next_due() == 2
+        assert 1 not in queue
+        assert queue.pop_due(50) == list(range(2, 10))
+        assert queue.pop_due(100) == [0]
+        assert queue.next_due() is None
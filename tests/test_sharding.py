@@ -0,0 +1,101 @@
+import functools
+
+import pytest
+
+import homework
+from sharding import HashRing, ShardMember
+from storage import SQLiteStateStore
+from subscriptions import SubscriptionRegistry
+
+
+class TestSharding:
+
+    def test_ring_moves_few_keys(self):
+        keys = [f'token{number}' for number in range(2000)]
+        before = HashRing(['0', '1', '2'])
+        after = HashRing(['0', '1', '2', '3'])
+        moved = sum(before.owner(key) != after.owner(key) for key in keys)
+        assert moved < len(keys) / 2
+        assert all(after.owner(key) == '3'
+                   for key in keys if before.owner(key) != after.owner(key))
+
+    def test_leases_are_exclusive_and_rebalance(self, tmp_path):
+        path = str(tmp_path / 'shards.sqlite3')
+        tokens = [f'token{number}' for number in range(200)]
+        first = ShardMember(path, 0)
+        second = ShardMember(path, 1)
+        first.heartbeat(tokens)
+        assert all(first.owns(token) for token in tokens)
+        second.heartbeat(tokens)
+        assert not any(second.owns(token) for token in tokens)
+        first.heartbeat(tokens)
+        second.heartbeat(tokens)
+        owned_first = {token for token in tokens if first.owns(token)}
+        owned_second = {token for token in tokens if second.owns(token)}
+        assert owned_first and owned_second
+        assert not owned_first & owned_second
+        assert owned_first | owned_second == set(tokens)
+        first.close()
+        second.heartbeat(tokens)
+        assert all(second.owns(token) for token in tokens)
+        second.close()
+
+    def test_claim_is_shared_between_workers(self, tmp_path):
+        path = str(tmp_path / 'shards.sqlite3')
+        first = ShardMember(path, 0)
+        second = ShardMember(path, 1)
+        first.heartbeat([])
+        second.heartbeat([])
+        assert first.claim('key') and first.claim('confirmed')
+        first.confirm('confirmed')
+        assert first.claim('key')
+        assert not second.claim('key')
+        assert second.claim('other')
+        first.close()
+        assert second.claim('key')
+        assert not second.claim('confirmed')
+        second.close()
+
+    def test_handover_reloads_state(self, tmp_path):
+        path = str(tmp_path / 'shards.sqlite3')
+        store = SQLiteStateStore(str(tmp_path / 'state.sqlite3'))
+        tokens = [f'token{number}' for number in range(50)]
+        registry = SubscriptionRegistry()
+        for token in tokens:
+            registry.add(token, 1, 0)
+        released = []
+        first = ShardMember(
+            path, 0,
+            on_release=lambda hashes: (released.extend(hashes),
+                                       store.flush()))
+        second = ShardMember(
+            path, 1,
+            on_acquire=functools.partial(homework.reload_owned, registry, store))
+        first.start(lambda: tokens)
+        second.start(lambda: tokens)
+        for subscription in registry:
+            store.save_cursor(subscription.state_key, 100)
+            store.save_status(subscription.state_key, '1', 'approved')
+        first.heartbeat(tokens)
+        second.heartbeat(tokens)
+        moved = [token for token in tokens if second.owns(token)]
+        assert moved and len(released) == len(moved)
+        for token in tokens:
+            subscription = registry.get(token, 1)
+            if token in moved:
+                assert subscription.from_date == 100
+                assert subscription.statuses.get('1') == 'approved'
+            else:
+                assert subscription.from_date == 0
+        first.close()
+        second.close()
+        store.close()
+
+    def test_sharding_requires_sqlite_state(self, monkeypatch):
+        monkeypatch.setattr(homework, 'check_tokens', lambda: True)
+        monkeypatch.setattr(homework, 'validate_tokens', lambda *args: [])
+        monkeypatch.setattr(homework, 'SHARD_WORKERS', '2')
+        monkeypatch.setattr(homework, 'STATE_BACKEND', 'aof')
+        monkeypatch.setattr(homework, 'run_supervisor', pytest.fail)
+        with pytest.raises(SystemExit):
+            homework.main()
@@ -0,0 +1,101 @@
+import functools
+import threading
+import time
+
+import pytest
+
+import homework
+from decoding import HomeworkRecord, StatusesResponse
+from singleflight import SingleFlight
+from subscriptions import SubscriptionRegistry
+
+
+class RecordingBot:
+
+    def __init__(self):
+        self.messages = []
+
+    def send_message(self, chat_id=None, text=None):
+        self.messages.append((chat_id, text))
+
+
+class TestSingleFlight:
+
+    def test_concurrent_calls_share_one_result(self):
+        flights = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return 'result'
+
+        results = []
+        leader = threading.Thread(
+            target=lambda: results.append(flights.do('key', fetch)))
+        leader.start()
+        started.wait(5)
+        followers = [
+            threading.Thread(
+                target=lambda: results.append(flights.do('key', fetch)))
+            for _ in range(5)]
+        for thread in followers:
+            thread.start()
+        while len(flights) != 1 or not all(
+                thread.is_alive() for thread in followers):
+            time.sleep(0.001)
+        time.sleep(0.05)
+        release.set()
+        for thread in [leader] + followers:
+            thread.join()
+        assert calls == [1]
+        assert results == ['result'] * 6
+        assert len(flights) == 0
+
+    def test_linger_reuses_result_and_errors_are_not_kept(self):
+        flights = SingleFlight(linger=60)
+        assert flights.do('key', lambda: 1) == 1
+        assert flights.do('key', lambda: 2) == 1
+        assert flights.do('other', lambda: 3) == 3
+
+        def fail():
+            raise ValueError('boom')
+
+        with pytest.raises(ValueError):
+            flights.do('broken', fail)
+        assert flights.do('broken', lambda: 4) == 4
+
+    def test_fetch_fans_out_to_every_chat(self, monkeypatch):
+        fetches = []
+
+        def fetch_homeworks(token, from_date, session=None, cache=None):
+            fetches.append((token, from_date))
+            if from_date == 100:
+                return StatusesResponse([], 100)
+            return StatusesResponse([HomeworkRecord(
+                1, 'hw.zip', 'approved', '2022-01-01T00:00:00Z')], 100)
+
+        monkeypatch.setattr(homework, 'fetch_homeworks', fetch_homeworks)
+        registry = SubscriptionRegistry()
+        student = registry.add('token', 1, from_date=5)
+        mentor = registry.add('token', 2, from_date=5)
+        paused = registry.add('token', 3, from_date=5)
+        paused.paused = True
+        bot = RecordingBot()
+        flights = SingleFlight(linger=60)
+        poll = functools.partial(
+            homework.poll_subscription, bot, registry=registry,
+            flights=flights)
+        changes = homework.STATUS_CHANGES.value
+        assert poll(student)
+        assert sorted(chat for chat, _ in bot.messages) == [1, 2]
+        assert homework.STATUS_CHANGES.value == changes + 1
+        assert student.from_date == mentor.from_date == 100
+        assert paused.from_date == 5
+        assert not poll(mentor)
+        assert not poll(student)
+        assert fetches == [('token', 5), ('token', 100)]
+        assert len(bot.messages) == 2
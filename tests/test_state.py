@@ -0,0 +1,28 @@
+from state import HomeworkStates, STATUS_NAMES, parse_date, status_code
+
+
+class TestHomeworkStates:
+
+    def test_behaves_like_status_dict(self):
+        states = HomeworkStates({'2': 'approved', '1': 'reviewing'})
+        states['hw.zip'] = 'rejected'
+        states['1'] = 'rejected'
+        assert states.get('1') == 'rejected'
+        assert states.get('3') is None
+        assert states['hw.zip'] == 'rejected'
+        assert '2' in states and '3' not in states
+        assert len(states) == 3
+        assert dict(states.items()) == {
+            '1': 'rejected', '2': 'approved', 'hw.zip': 'rejected'}
+
+    def test_records_keep_name_and_date(self):
+        states = HomeworkStates()
+        states.set(5, 'approved', 'hw05.zip', '2020-02-13T14:40:57Z')
+        assert list(states.records()) == [
+            ('5', 'hw05.zip', 'approved', 1581604857)]
+
+    def test_status_codes_are_small_ints(self):
+        code = status_code('approved')
+        assert 0 < code < 256
+        assert STATUS_NAMES[code] == 'approved'
+        assert parse_date('garbage') == 0
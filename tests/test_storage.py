@@ -0,0 +1,62 @@
+import pytest
+
+from storage import AppendOnlyStateStore, SQLiteStateStore
+
+
+@pytest.fixture(params=[SQLiteStateStore, AppendOnlyStateStore])
+def store_path(request, tmp_path):
+    return request.param, str(tmp_path / 'state')
+
+
+class TestStateStore:
+
+    def test_state_survives_reopen(self, store_path):
+        store_class, path = store_path
+        store = store_class(path)
+        store.save_cursor('token', 100)
+        store.save_cursor('token', 200)
+        store.save_status('token', 1, 'reviewing')
+        store.save_status('token', 1, 'approved')
+        store.save_status('token', 2, 'rejected')
+        assert store.load() == ({}, {})
+        store.close()
+
+        store = store_class(path)
+        cursors, statuses = store.load()
+        store.close()
+        assert cursors == {'token': 200}
+        assert statuses == {'token': {'1': 'approved', '2': 'rejected'}}
+
+    def test_failed_flush_keeps_batch(self, store_path, monkeypatch):
+        store_class, path = store_path
+        store = store_class(path)
+        store.save_cursor('token', 100)
+        store.save_status('token', 1, 'approved')
+
+        def fail(cursors, statuses):
+            raise OSError('диск заполнен')
+
+        with monkeypatch.context() as patch:
+            patch.setattr(store, '_write', fail)
+            with pytest.raises(OSError):
+                store.flush()
+        store.save_cursor('token', 200)
+        store.close()
+
+        store = store_class(path)
+        cursors, statuses = store.load()
+        store.close()
+        assert cursors == {'token': 200}
+        assert statuses == {'token': {'1': 'approved'}}
+
+    def test_append_only_compacts_on_load(self, tmp_path):
+        path = tmp_path / 'state'
+        store = AppendOnlyStateStore(str(path))
+        for from_date in range(10):
+            store.save_cursor('token', from_date)
+            store.flush()
+        assert len(path.read_text().splitlines()) == 10
+        assert store.load_keys(['token']) == ({'token': 9}, {})
+        assert len(path.read_text().splitlines()) == 10
+        assert store.load() == ({'token': 9}, {})
+        assert len(path.read_text().splitlines()) == 1
@@ -0,0 +1,44 @@
+from subscriptions import SubscriptionRegistry, load_subscriptions
+
+
+class TestSubscriptions:
+
+    def test_registry_add_keeps_cursor(self):
+        registry = SubscriptionRegistry()
+        subscription = registry.add('token', 1, from_date=100)
+        subscription.from_date = 200
+        same = registry.add('token', '1', from_date=0)
+        assert same is subscription
+        assert same.from_date == 200
+        assert len(registry) == 1
+
+    def test_token_from_several_chats(self):
+        registry = SubscriptionRegistry()
+        first = registry.add('token', 1)
+        second = registry.add('token', 2)
+        assert first is not second
+        assert registry.for_token('token') == [first, second]
+        assert registry.get(('token', '2')) is second
+        assert registry.get('token', 2) is second
+        assert registry.get('token') is first
+        assert registry.tokens() == ['token']
+        assert len(registry) == 2
+
+    def test_load_subscriptions(self, tmp_path):
+        path = tmp_path / 'subscriptions.txt'
+        path.write_text('# comment\ntoken1 111\n\ntoken2 222\n')
+        registry = load_subscriptions(str(path), SubscriptionRegistry(), 5)
+        assert 'token1' in registry and 'token2' in registry
+        assert registry.get('token2').chat_id == '222'
+        assert registry.get('token1').from_date == 5
+
+    def test_chat_index_follows_removal(self):
+        registry = SubscriptionRegistry()
+        registry.add('token', 1)
+        registry.add('token', 2)
+        registry.remove('token', 1)
+        assert registry.for_chat(1) == []
+        assert [sub.token for sub in registry.for_chat(2)] == ['token']
+        registry.remove('token', 2)
+        assert registry.for_chat(2) == []
+        assert 'token' not in registry
@@ -0,0 +1,86 @@
+import json
+import os
+
+import pytest
+
+import homework
+from templates import DEFAULT_TEMPLATES, MessageTemplates, compile_template
+
+
+class TestMessageTemplates:
+
+    def test_default_locale_matches_parse_status(self):
+        templates = MessageTemplates()
+        assert (
+            DEFAULT_TEMPLATES['locales']['ru']['verdicts']
+            == homework.HOMEWORK_STATUSES
+        )
+        assert templates.render(None, 'hw.zip', 'approved') == (
+            'Изменился статус проверки работы "hw.zip" '
+            + homework.HOMEWORK_STATUSES['approved'])
+
+    def test_chat_locale_and_fallback(self):
+        templates = MessageTemplates()
+        templates.set_locale(42, 'en')
+        assert templates.render(42, 'hw.zip', 'rejected').startswith(
+            'Review status of "hw.zip"')
+        templates.set_locale(7, 'de')
+        assert templates.render(7, 'hw.zip', 'rejected').startswith(
+            'Изменился статус')
+
+    def test_chat_templates(self):
+        templates = MessageTemplates(dict(DEFAULT_TEMPLATES, chats={
+            '1': {'message': '{homework_name} - {verdict}',
+                  'verdicts': {'approved': 'принято'}},
+            '2': {'locale': 'en', 'verdicts': {'rejected': 'Fix it.'}},
+            '3': 'en',
+        }))
+        assert templates.render(1, 'hw', 'approved') == 'hw - принято'
+        assert templates.render(1, 'hw', 'rejected').startswith(
+            'hw - Работа проверена')
+        assert templates.render(2, 'hw', 'rejected') == (
+            'Review status of "hw" changed: Fix it.')
+        assert templates.render(3, 'hw', 'rejected').endswith('remarks.')
+
+    @pytest.mark.parametrize('message', [
+        'Статус: {verdict}',
+        '{homework_name}: {verdict} ({homework_name})',
+    ])
+    def test_template_needs_one_homework_name(self, message):
+        with pytest.raises(ValueError):
+            compile_template(message, 'принято')
+        with pytest.raises(ValueError):
+            MessageTemplates(dict(DEFAULT_TEMPLATES, chats={
+                '1': {'message': message}}))
+
+    def test_rendered_texts_are_cached(self):
+        templates = MessageTemplates()
+        for _ in range(3):
+            templates.render(None, 'hw.zip', 'reviewing')
+        info = templates.render_cached.cache_info()
+        assert info.hits == 2 and info.misses == 1
+
+    def test_reload_replaces_templates_and_cache(self, tmp_path):
+        path = tmp_path / 'templates.json'
+        config = {'locales': {'ru': {
+            'message': '{homework_name}: {verdict}',
+            'verdicts': {'approved': 'принято'},
+        }}, 'chats': {'1': 'ru'}}
+        path.write_text(json.dumps(config), encoding='UTF-8')
+        templates = MessageTemplates(path=str(path))
+        templates.load()
+        assert templates.render(1, 'hw.zip', 'approved') == 'hw.zip: принято'
+        config['locales']['ru']['verdicts']['approved'] = 'зачтено'
+        path.write_text(json.dumps(config), encoding='UTF-8')
+        os.utime(path, (1, 1))
+        assert templates.reload_if_changed()
+        assert templates.render(1, 'hw.zip', 'approved') == 'hw.zip: зачтено'
+        assert not templates.reload_if_changed()
+
+    def test_broken_file_keeps_previous_templates(self, tmp_path):
+        path = tmp_path / 'templates.json'
+        path.write_text('{', encoding='UTF-8')
+        templates = MessageTemplates(path=str(path))
+        assert not templates.reload()
+        assert templates.render(None, 'hw.zip', 'approved').startswith(
+            'Изменился статус')
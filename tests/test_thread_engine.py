@@ -0,0 +1,72 @@
+import threading
+import time
+
+from scheduler import AdaptivePolicy, DueQueue
+from subscriptions import SubscriptionRegistry
+from thread_engine import HostLimiter, ThreadEngine, parse_host_limits
+
+
+def build(count):
+    registry = SubscriptionRegistry()
+    for number in range(count):
+        registry.add(f'token{number}', number)
+    queue = DueQueue()
+    for subscription in registry:
+        queue.push(subscription.key, 0)
+    return registry, queue
+
+
+class TestThreadEngine:
+
+    def test_parse_host_limits(self):
+        assert parse_host_limits('a.ru=4, b.ru=2,') == {'a.ru': 4, 'b.ru': 2}
+
+    def test_host_cap_and_single_fetch_per_subscription(self):
+        registry, queue = build(20)
+        lock = threading.Lock()
+        state = {'active': 0, 'peak': 0, 'polls': 0}
+        inflight = set()
+        overlaps = []
+        stop = threading.Event()
+
+        def poll(bot, subscription):
+            with lock:
+                if subscription.token in inflight:
+                    overlaps.append(subscription.token)
+                inflight.add(subscription.token)
+                state['active'] += 1
+                state['peak'] = max(state['peak'], state['active'])
+            time.sleep(0.005)
+            with lock:
+                inflight.discard(subscription.token)
+                state['active'] -= 1
+                state['polls'] += 1
+                if state['polls'] >= 60:
+                    stop.set()
+            return False
+
+        engine = ThreadEngine(
+            poll, workers=8, queue_size=4,
+            limiter=HostLimiter({'practicum': 3}),
+            host=lambda subscription: 'practicum')
+        policy = AdaptivePolicy(min_interval=0, max_interval=0,
+                                default_interval=0, jitter=0)
+        engine.run_forever(None, registry, queue, policy, stop)
+        assert state['polls'] >= 60
+        assert state['peak'] <= 3
+        assert overlaps == []
+
+    def test_stop_drops_queued_work(self):
+        registry, queue = build(10)
+        stop = threading.Event()
+        polled = []
+
+        def poll(bot, subscription):
+            polled.append(subscription.token)
+            stop.set()
+            time.sleep(0.05)
+            return False
+
+        engine = ThreadEngine(poll, workers=1, queue_size=5)
+        engine.run_forever(None, registry, queue, AdaptivePolicy(), stop)
+        assert len(polled) < 10
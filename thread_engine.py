@@ -0,0 +1,158 @@
+import logging
+import queue
+import threading
+import time
+
+import metrics
+from scheduler import POLL_QUEUE_DUE, POLL_QUEUE_SIZE
+
+WORK_QUEUE_SIZE = metrics.REGISTRY.gauge(
+    'bot_work_queue_size', 'Опросы, ждущие свободного потока')
+
+
+def parse_host_limits(value):
+    """Лимиты по хостам из строки вида `host=4,other.host=2`."""
+    limits = {}
+    for item in filter(None, (part.strip() for part in value.split(','))):
+        host, _, limit = item.partition('=')
+        limits[host.strip()] = int(limit)
+    return limits
+
+
+class HostLimiter:
+    """Ограничение одновременных запросов к каждому хосту."""
+
+    def __init__(self, limits=None, default_limit=10):
+        self.limits = dict(limits or {})
+        self.default_limit = default_limit
+        self._semaphores = {}
+        self._lock = threading.Lock()
+
+    def semaphore(self, host):
+        """Семафор хоста, создаётся при первом обращении."""
+        with self._lock:
+            semaphore = self._semaphores.get(host)
+            if semaphore is None:
+                semaphore = self._semaphores[host] = threading.Semaphore(
+                    self.limits.get(host, self.default_limit))
+            return semaphore
+
+
+class ThreadEngine:
+    """Опрос подписок пулом потоков с обычными блокирующими вызовами.
+
+    Поток планировщика берёт подписки из очереди сроков и кладёт их
+    в ограниченную очередь работ: когда она заполнена, планировщик
+    ждёт. Рабочие потоки опрашивают подписки под семафором хоста.
+    Подписка, опрос которой ещё идёт, повторно в работу не попадает.
+    """
+
+    def __init__(self, poll, workers=10, queue_size=100, limiter=None,
+                 host=lambda subscription: None):
+        self.poll = poll
+        self.workers = workers
+        self.limiter = limiter or HostLimiter(default_limit=workers)
+        self.host = host
+        self._work = queue.Queue(maxsize=queue_size)
+        self._done = queue.Queue()
+        self._inflight = set()
+        self._threads = []
+
+    def _run_worker(self, bot):
+        while True:
+            subscription = self._work.get()
+            if subscription is None:
+                return
+            changed = False
+            try:
+                with self.limiter.semaphore(self.host(subscription)):
+                    changed = self.poll(bot, subscription)
+            except Exception as error:
+                logging.error('Сбой опроса подписки: %s', error)
+            self._done.put((subscription, changed is True))
+
+    def start(self, bot):
+        """Запустить рабочие потоки."""
+        for number in range(self.workers):
+            thread = threading.Thread(
+                target=self._run_worker, args=(bot,),
+                name=f'poll-{number}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _collect(self, due_queue, policy, timeout=0, stop=None):
+        """Переназначить сроки завершённых опросов.
+
+        Ждёт первого завершения не дольше `timeout`, просыпаясь при `stop`.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                subscription, changed = self._done.get(
+                    timeout=max(0, min(0.5, deadline - time.monotonic())))
+                break
+            except queue.Empty:
+                if (time.monotonic() >= deadline
+                        or (stop is not None and stop.is_set())):
+                    return
+        while True:
+            self._inflight.discard(subscription.key)
+            due_queue.push(
+                subscription.key, policy.reschedule(subscription, changed))
+            try:
+                subscription, changed = self._done.get_nowait()
+            except queue.Empty:
+                return
+
+    def _submit(self, subscription, due_queue, policy, stop):
+        """Положить подписку в очередь работ, ожидая свободного места."""
+        while not stop.is_set():
+            try:
+                self._work.put(subscription, timeout=0.5)
+            except queue.Full:
+                self._collect(due_queue, policy)
+                continue
+            self._inflight.add(subscription.key)
+            return True
+        return False
+
+    def run_forever(self, bot, registry, due_queue, policy, stop):
+        """Опрашивать подписки по очереди сроков, пока не выставлен `stop`."""
+        self.start(bot)
+        try:
+            while not stop.is_set():
+                for key in registry.take_added():
+                    if key not in self._inflight:
+                        due_queue.push(key, 0)
+                self._collect(due_queue, policy)
+                due = due_queue.pop_due(time.time())
+                POLL_QUEUE_DUE.set(len(due))
+                POLL_QUEUE_SIZE.set(len(due_queue))
+                for key in due:
+                    subscription = registry.get(key)
+                    if subscription is None or key in self._inflight:
+                        continue
+                    if not self._submit(subscription, due_queue, policy, stop):
+                        break
+                WORK_QUEUE_SIZE.set(self._work.qsize())
+                next_due = due_queue.next_due()
+                if next_due is None:
+                    next_due = time.time() + policy.default_interval
+                self._collect(due_queue, policy, min(
+                    policy.min_interval, max(0, next_due - time.time())),
+                    stop)
+        finally:
+            self.close()
+
+    def close(self):
+        """Отменить ожидающие опросы и дождаться текущих."""
+        try:
+            while True:
+                self._work.get_nowait()
+        except queue.Empty:
+            pass
+        for _ in self._threads:
+            self._work.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []